@@ -1,16 +1,117 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from config import settings
 
-engine = create_engine(
-    settings.DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in settings.DATABASE_URL else {}
-)
+# Drivers used by the request handlers' async engine, by database backend
+ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+def async_database_url(database_url: str) -> str:
+    """The async-driver form of ``database_url``, unless ASYNC_DATABASE_URL overrides it"""
+    if settings.ASYNC_DATABASE_URL:
+        return settings.ASYNC_DATABASE_URL
+    url = make_url(database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f"No async driver known for {url.get_backend_name()}; set ASYNC_DATABASE_URL")
+    return url.set(drivername=driver).render_as_string(hide_password=False)
+
+def engine_options(database_url: str) -> dict:
+    """create_engine keyword arguments for the database behind ``database_url``"""
+    url = make_url(database_url)
+    backend = url.get_backend_name()
+    if backend == "sqlite" and url.database in (None, "", ":memory:"):
+        # In-memory databases live in a single connection; keep SQLAlchemy's pool for them
+        return {"connect_args": {"check_same_thread": False}}
+
+    options = {
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT
+    }
+    if backend == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if url.get_driver_name() == "aiosqlite":
+            # SQLAlchemy defaults aiosqlite to NullPool, which reopens the file (and a thread) per session
+            options["poolclass"] = AsyncAdaptedQueuePool
+        return options
+
+    # Recycle before the server or a proxy drops idle connections; pre-ping catches the rest
+    options["pool_recycle"] = settings.DB_POOL_RECYCLE
+    options["pool_pre_ping"] = settings.DB_POOL_PRE_PING
+    if url.get_driver_name() == "asyncpg":
+        options["connect_args"] = {
+            "timeout": settings.DB_CONNECT_TIMEOUT,
+            "server_settings": {"application_name": "docview"}
+        }
+    elif backend == "postgresql":
+        options["connect_args"] = {
+            "connect_timeout": settings.DB_CONNECT_TIMEOUT,
+            "application_name": "docview"
+        }
+    return options
+
+def apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """Per-connection SQLite tuning.
+
+    WAL lets readers run while the scanner or processing queue commits, and
+    synchronous=NORMAL is durable in WAL mode except across power loss.
+    """
+    cursor = dbapi_connection.cursor()
+    try:
+        cursor.execute(f"PRAGMA busy_timeout = {settings.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size = {settings.SQLITE_MMAP_SIZE}")
+        cursor.execute(f"PRAGMA cache_size = {-settings.SQLITE_CACHE_SIZE_KB}")
+    finally:
+        cursor.close()
+
+# The sync engine serves the scanner, watcher and processing workers; request
+# handlers use the async engine so a slow query never blocks the event loop
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL))
+
+_async_url = async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(_async_url, **engine_options(_async_url))
+
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", apply_sqlite_pragmas)
+    event.listen(async_engine.sync_engine, "connect", apply_sqlite_pragmas)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Objects stay usable after commit; reloading expired attributes would need I/O outside an await
+AsyncSessionLocal = async_sessionmaker(async_engine, class_=AsyncSession, autoflush=False, expire_on_commit=False)
 Base = declarative_base()
 
+# FTS5 index over document_pages.text, kept in sync by triggers. Words are
+# Porter-stemmed and diacritics folded, so "receiving" matches "received" and
+# bm25() ranks pages; the vocabulary table feeds fuzzy term expansion.
+SQLITE_FTS_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS document_pages_search USING fts5(
+        text, content='document_pages', content_rowid='id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS document_pages_search_vocab USING fts5vocab(
+        document_pages_search, 'row'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS document_pages_search_ai AFTER INSERT ON document_pages BEGIN
+        INSERT INTO document_pages_search(rowid, text) VALUES (new.id, new.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS document_pages_search_ad AFTER DELETE ON document_pages BEGIN
+        INSERT INTO document_pages_search(document_pages_search, rowid, text) VALUES ('delete', old.id, old.text);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS document_pages_search_au AFTER UPDATE ON document_pages BEGIN
+        INSERT INTO document_pages_search(document_pages_search, rowid, text) VALUES ('delete', old.id, old.text);
+        INSERT INTO document_pages_search(rowid, text) VALUES (new.id, new.text);
+    END""",
+]
+
+def is_sqlite() -> bool:
+    return engine.dialect.name == "sqlite"
+
 def get_db():
     db = SessionLocal()
     try:
@@ -18,6 +119,23 @@ def get_db():
     finally:
         db.close()
 
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
 def create_tables():
     from app.models.document import Document
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    from app.models.document_page import DocumentPage
+    from app.models.processing_job import ProcessingJob
+    from app.models.file_manifest import FileManifest
+    from app.models.document_tag import DocumentTag
+    from app.models.upload_session import UploadSession
+    from app.database.migrations import run_migrations
+    Base.metadata.create_all(bind=engine)
+
+    if is_sqlite():
+        with engine.begin() as conn:
+            for statement in SQLITE_FTS_DDL:
+                conn.execute(text(statement))
+
+    run_migrations()
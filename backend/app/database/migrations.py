@@ -0,0 +1,71 @@
+from sqlalchemy import inspect, text
+
+from app.database.connection import engine, Base
+
+def add_missing_columns():
+    """Add columns that were introduced after a table was first created"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in existing:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+
+def add_missing_indexes():
+    """Create indexes declared on tables that already existed (create_all skips those)"""
+    inspector = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in existing:
+                    index.create(bind=conn)
+
+def backfill_document_tags(conn):
+    from app.models.document_tag import DocumentTag
+
+    rows = conn.execute(text("SELECT id, tags FROM documents WHERE tags IS NOT NULL AND tags != ''")).all()
+    for document_id, tags in rows:
+        for tag in DocumentTag.normalize(tags):
+            conn.execute(
+                DocumentTag.__table__.insert().prefix_with("OR IGNORE" if engine.dialect.name == "sqlite" else ""),
+                {"document_id": document_id, "tag": tag}
+            )
+
+def rebuild_search_index(conn):
+    """Replace the trigram page index with the stemmed one, indexing pages stored so far"""
+    if engine.dialect.name != "sqlite":
+        return
+    for trigger in ("document_pages_ai", "document_pages_ad", "document_pages_au"):
+        conn.execute(text(f"DROP TRIGGER IF EXISTS {trigger}"))
+    conn.execute(text("DROP TABLE IF EXISTS document_pages_fts"))
+    conn.execute(text("INSERT INTO document_pages_search(document_pages_search) VALUES ('rebuild')"))
+
+# Data migrations, applied once each in order and recorded in schema_migrations
+DATA_MIGRATIONS = [
+    ("0001_backfill_document_tags", backfill_document_tags),
+    ("0002_rebuild_search_index", rebuild_search_index),
+]
+
+def run_migrations():
+    """Bring an existing database up to the current models"""
+    add_missing_columns()
+    add_missing_indexes()
+
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE IF NOT EXISTS schema_migrations (name VARCHAR(100) PRIMARY KEY)"))
+        applied = {row[0] for row in conn.execute(text("SELECT name FROM schema_migrations"))}
+
+    for name, migration in DATA_MIGRATIONS:
+        if name in applied:
+            continue
+        with engine.begin() as conn:
+            migration(conn)
+            conn.execute(text("INSERT INTO schema_migrations (name) VALUES (:name)"), {"name": name})
+        print(f"Applied migration {name}")
@@ -1,12 +1,22 @@
-from fastapi import FastAPI
-from fastapi.staticfiles import StaticFiles
+from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import text
+import hashlib
 import os
 
 from app.routers import documents, upload
-from app.database.connection import create_tables
-from app.services.directory_scanner import DirectoryScanner
+from app.database.connection import async_engine, create_tables
+from app.services.document_cache import get_document_cache
+from app.services.processing_queue import get_processing_queue
+from app.services.scan_scheduler import get_scan_scheduler
+from app.services.directory_watcher import get_directory_watcher
+from app.services.render_executor import get_render_executor, shutdown_render_executor
+from app.services.pdf_processor import document_pool
+from app.utils.compression import CompressionMiddleware
+from app.utils.responses import is_not_modified
+from app.utils.static_files import StaticAssets
 from config import settings
 
 app = FastAPI(
@@ -21,28 +31,34 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Total-Count", "X-Next-Cursor", "Link", "Upload-Offset", "Accept-Ranges", "Content-Range", "Content-Length"],
 )
 
-create_tables()
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(CompressionMiddleware)
 
-# Initialize directory scanner and scan for documents on startup
+app.state.database_ready = False
+
+# Create tables, then scan for documents in the background so startup returns immediately
 @app.on_event("startup")
 async def startup_event():
-    from app.database.connection import SessionLocal
-    db = SessionLocal()
-    try:
-        scanner = DirectoryScanner()
-        results = scanner.scan_all_directories(db)
-        summary = {
-            "added": len(results['added']),
-            "updated": len(results['updated']),
-            "errors": len(results['errors'])
-        }
-        print(f"Startup scan results: {summary}")
-    except Exception as e:
-        print(f"Startup scan error: {e}")
-    finally:
-        db.close()
+    await run_in_threadpool(create_tables)
+    app.state.database_ready = True
+    
+    get_processing_queue().start()
+    get_scan_scheduler().start()
+    if settings.WATCH_UPLOADS:
+        get_directory_watcher().start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if settings.WATCH_UPLOADS:
+        get_directory_watcher().stop()
+    get_scan_scheduler().stop()
+    get_processing_queue().stop()
+    shutdown_render_executor()
+    document_pool.close_all()
+    await async_engine.dispose()
 
 app.include_router(documents.router, prefix="/api/documents", tags=["documents"])
 app.include_router(upload.router, prefix="/api/upload", tags=["upload"])
@@ -51,11 +67,28 @@ app.include_router(upload.router, prefix="/api/upload", tags=["upload"])
 project_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
 frontend_dir = os.path.join(project_root, "frontend")
 
-app.mount("/static", StaticFiles(directory=frontend_dir), name="static")
+static_assets = StaticAssets(directory=frontend_dir)
+app.mount("/static", static_assets, name="static")
 
 @app.get("/")
-async def read_root():
-    return FileResponse(os.path.join(frontend_dir, "index.html"))
+async def read_root(request: Request):
+    # Asset URLs carry content hashes, so the page itself is always revalidated
+    html = await run_in_threadpool(static_assets.render_page, os.path.join(frontend_dir, "index.html"))
+    headers = {
+        "ETag": f'"{hashlib.sha256(html.encode("utf-8")).hexdigest()[:32]}"',
+        "Cache-Control": "no-cache"
+    }
+    if is_not_modified(request.headers, headers["ETag"], None):
+        return Response(status_code=304, headers=headers)
+    return HTMLResponse(html, headers=headers)
+
+async def check_database() -> bool:
+    try:
+        async with async_engine.connect() as conn:
+            await conn.execute(text("SELECT 1"))
+        return True
+    except Exception:
+        return False
 
 @app.get("/health")
 async def health_check():
@@ -65,6 +98,25 @@ async def health_check():
 async def api_health_check():
     return {"status": "healthy", "service": "military-pdf-viewer"}
 
+@app.get("/api/health/live")
+async def liveness_check():
+    return {"status": "alive", "service": "military-pdf-viewer"}
+
+@app.get("/api/health/ready")
+async def readiness_check():
+    database_ok = app.state.database_ready and await check_database()
+    body = {
+        "status": "ready" if database_ok else "not_ready",
+        "service": "military-pdf-viewer",
+        "database": "ok" if database_ok else "unavailable",
+        "database_pool": async_engine.pool.status(),
+        "document_cache": get_document_cache().stats(),
+        "render_pool": get_render_executor().stats(),
+        "pdf_handles": document_pool.stats(),
+        "scan": get_scan_scheduler().status()
+    }
+    return JSONResponse(content=body, status_code=200 if database_ok else 503)
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
@@ -1,6 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Text, Enum, Index
+from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database.connection import Base
+from app.models.document_tag import DocumentTag
 import enum
 
 class CategoryEnum(enum.Enum):
@@ -10,6 +12,13 @@ class CategoryEnum(enum.Enum):
 
 class Document(Base):
     __tablename__ = "documents"
+    __table_args__ = (
+        # Listings filter on is_active (+ category) and page on (upload_date, id)
+        Index("ix_documents_active_category_upload", "is_active", "category", "upload_date", "id"),
+        Index("ix_documents_active_upload", "is_active", "upload_date", "id"),
+        # Scanner lookups by file name within a category
+        Index("ix_documents_category_original_name", "category", "original_name"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     filename = Column(String(255), nullable=False)
@@ -17,6 +26,9 @@ class Document(Base):
     category = Column(Enum(CategoryEnum), nullable=False)
     file_path = Column(String(500), nullable=False)
     file_size = Column(Integer, nullable=False)
+    content_hash = Column(String(64), index=True)
+    # Hash of the bytes as uploaded, when linearizing changed them; used for dedup
+    upload_hash = Column(String(64), index=True)
     page_count = Column(Integer)
     upload_date = Column(DateTime(timezone=True), server_default=func.now())
     last_accessed = Column(DateTime(timezone=True), onupdate=func.now())
@@ -26,19 +38,51 @@ class Document(Base):
     created_by = Column(String(100))
     is_active = Column(Boolean, default=True)
 
+    tag_rows = relationship(DocumentTag, cascade="all, delete-orphan", passive_deletes=True)
+
+    # Fields exposed by the API, in response order
+    SERIALIZABLE_FIELDS = (
+        "id", "filename", "original_name", "category", "file_size", "page_count",
+        "upload_date", "last_accessed", "description", "tags",
+        "classification_level", "created_by", "is_active"
+    )
+
+    def set_tags(self, tags: str):
+        """Set the comma-separated tags and keep the document_tags rows in step"""
+        self.tags = tags
+        self.tag_rows = [DocumentTag(tag=tag) for tag in DocumentTag.normalize(tags)]
+
+    @staticmethod
+    def serialize_value(field: str, value):
+        if field == "tags":
+            return value.split(",") if value else []
+        if value is None:
+            return None
+        if field == "category":
+            return value.value
+        if field in ("upload_date", "last_accessed"):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def serialize_rows(fields, rows) -> list:
+        """Response dicts straight from projected row tuples, for ORJSONResponse.
+
+        Only tags need converting; orjson encodes the enum and datetime
+        columns itself, the same way ``serialize_value`` would.
+        """
+        fields = tuple(fields)
+        if "tags" not in fields:
+            return [dict(zip(fields, row)) for row in rows]
+
+        tags_index = fields.index("tags")
+        documents = []
+        for row in rows:
+            document = dict(zip(fields, row))
+            tags = row[tags_index]
+            document["tags"] = tags.split(",") if tags else []
+            documents.append(document)
+        return documents
+
     def to_dict(self):
-        return {
-            "id": self.id,
-            "filename": self.filename,
-            "original_name": self.original_name,
-            "category": self.category.value if self.category else None,
-            "file_size": self.file_size,
-            "page_count": self.page_count,
-            "upload_date": self.upload_date.isoformat() if self.upload_date else None,
-            "last_accessed": self.last_accessed.isoformat() if self.last_accessed else None,
-            "description": self.description,
-            "tags": self.tags.split(",") if self.tags else [],
-            "classification_level": self.classification_level,
-            "created_by": self.created_by,
-            "is_active": self.is_active
-        }
\ No newline at end of file
+        return {field: self.serialize_value(field, getattr(self, field)) for field in self.SERIALIZABLE_FIELDS}
\ No newline at end of file
@@ -0,0 +1,18 @@
+from sqlalchemy import Column, Integer, Float, Text, LargeBinary, ForeignKey, UniqueConstraint
+from app.database.connection import Base
+
+class DocumentPage(Base):
+    __tablename__ = "document_pages"
+    __table_args__ = (
+        UniqueConstraint("document_id", "page_number", name="uq_document_pages_document_page"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    page_number = Column(Integer, nullable=False)
+    # Page size in points, the coordinate space of the word boxes
+    width = Column(Float)
+    height = Column(Float)
+    text = Column(Text, nullable=False, default="")
+    # zlib-compressed JSON list of [x0, y0, x1, y1, word, block, line]
+    words = Column(LargeBinary)
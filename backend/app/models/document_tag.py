@@ -0,0 +1,22 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
+from app.database.connection import Base
+
+class DocumentTag(Base):
+    """One row per (document, tag); tags are stored lower-cased for exact matching"""
+    __tablename__ = "document_tags"
+    __table_args__ = (
+        Index("ix_document_tags_tag_document", "tag", "document_id"),
+    )
+
+    document_id = Column(Integer, ForeignKey("documents.id", ondelete="CASCADE"), primary_key=True)
+    tag = Column(String(100), primary_key=True)
+
+    @staticmethod
+    def normalize(tags: str) -> list:
+        """Split a comma-separated tag string into unique normalized tags, keeping order"""
+        seen = []
+        for tag in (tags or "").split(","):
+            tag = tag.strip().lower()[:100]
+            if tag and tag not in seen:
+                seen.append(tag)
+        return seen
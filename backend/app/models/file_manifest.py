@@ -0,0 +1,21 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Enum, ForeignKey
+from sqlalchemy.sql import func
+from app.database.connection import Base
+from app.models.document import CategoryEnum
+
+class FileManifest(Base):
+    """Last seen state of every PDF under the uploads tree, used to diff rescans"""
+    __tablename__ = "file_manifest"
+
+    id = Column(Integer, primary_key=True)
+    path = Column(String(500), nullable=False, unique=True)
+    category = Column(Enum(CategoryEnum), nullable=False, index=True)
+    size = Column(BigInteger, nullable=False)
+    mtime_ns = Column(BigInteger, nullable=False)
+    inode = Column(BigInteger)
+    content_hash = Column(String(64))
+    document_id = Column(Integer, ForeignKey("documents.id"), index=True)
+    scanned_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def matches(self, size: int, mtime_ns: int, inode: int) -> bool:
+        return self.size == size and self.mtime_ns == mtime_ns and self.inode == inode
@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey
+from sqlalchemy.sql import func
+from app.database.connection import Base
+
+class JobStatus:
+    pending = "pending"
+    running = "running"
+    completed = "completed"
+    failed = "failed"
+
+class ProcessingJob(Base):
+    __tablename__ = "processing_jobs"
+
+    id = Column(Integer, primary_key=True)
+    document_id = Column(Integer, ForeignKey("documents.id"), nullable=False, index=True)
+    upload_id = Column(String(36), index=True)
+    status = Column(String(20), nullable=False, default=JobStatus.pending, index=True)
+    stage = Column(String(50))
+    progress = Column(Integer, nullable=False, default=0)
+    error = Column(Text)
+    attempts = Column(Integer, nullable=False, default=0)
+    retry_at = Column(DateTime)  # set while a failed job waits to be retried
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "document_id": self.document_id,
+            "status": self.status,
+            "stage": self.stage,
+            "progress": self.progress,
+            "error": self.error,
+            "attempts": self.attempts,
+            "retry_at": self.retry_at.isoformat() if self.retry_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
@@ -0,0 +1,43 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Text, Enum, ForeignKey
+from sqlalchemy.sql import func
+from app.database.connection import Base
+from app.models.document import CategoryEnum
+
+class UploadSessionStatus:
+    open = "open"
+    completed = "completed"
+    failed = "failed"
+    aborted = "aborted"
+
+class UploadSession(Base):
+    """Server-side state of a resumable chunked upload; the id doubles as the upload_id"""
+    __tablename__ = "upload_sessions"
+
+    id = Column(String(36), primary_key=True)
+    filename = Column(String(255), nullable=False)
+    category = Column(Enum(CategoryEnum), nullable=False)
+    total_size = Column(BigInteger, nullable=False)
+    received_bytes = Column(BigInteger, nullable=False, default=0)
+    temp_path = Column(String(500), nullable=False)
+    description = Column(Text)
+    tags = Column(String(500))
+    classification_level = Column(String(50))
+    created_by = Column(String(100))
+    status = Column(String(20), nullable=False, default=UploadSessionStatus.open, index=True)
+    error = Column(Text)
+    document_id = Column(Integer, ForeignKey("documents.id"))
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    def to_dict(self):
+        return {
+            "upload_id": self.id,
+            "filename": self.filename,
+            "category": self.category.value if self.category else None,
+            "status": self.status,
+            "offset": self.received_bytes,
+            "total_size": self.total_size,
+            "error": self.error,
+            "document_id": self.document_id,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None
+        }
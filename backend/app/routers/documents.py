@@ -1,40 +1,269 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
-from fastapi.responses import StreamingResponse, FileResponse
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Path, Query, Request
+from fastapi.responses import Response, FileResponse, JSONResponse, ORJSONResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from sqlalchemy import String, func, select, type_coerce, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import timezone
+from email.utils import format_datetime
 from typing import List, Optional
-import os
+import asyncio
+import base64
+import hashlib
+import uuid
 
-from app.database.connection import get_db
+from app.database.connection import SessionLocal, get_async_db, is_sqlite
 from app.models.document import Document, CategoryEnum
+from app.models.document_page import DocumentPage
+from app.models.document_tag import DocumentTag
+from app.services.document_cache import DocumentRecord, get_document_cache
+from app.services.scan_scheduler import get_scan_scheduler, ScanInProgressError
+from app.services.search_index import SearchIndex
+from app.services.file_manager import FileManager
+from app.services.page_cache import get_page_cache
 from app.services.pdf_processor import PDFProcessor
-from app.services.directory_scanner import DirectoryScanner
+from app.services.processing_queue import get_processing_queue
+from app.services.render_executor import get_render_executor
+from app.services.thumbnail_sprite import SPRITE_PAGE, load_sprite_map, sprite_variant, store_sprite
+from app.services.tile_prefetcher import get_tile_prefetcher, tile_variant
+from app.utils.pagination import encode_cursor, decode_cursor
+from app.utils.responses import RangeFileResponse, is_not_modified
+from app.utils.search_query import QuerySyntaxError
 from config import settings
 
 router = APIRouter()
 
-def resolve_file_path(file_path: str) -> str:
-    """Resolve file path relative to the application root"""
-    if file_path.startswith('./'):
-        # Get the directory where the application is running from
-        import os
-        app_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
-        return os.path.join(app_root, file_path[2:])  # Remove './' prefix
-    return file_path
+async def get_active_document(document_id: int, db: AsyncSession) -> DocumentRecord:
+    """Active document by id, served from the document cache when possible"""
+    document_cache = get_document_cache()
+    record = document_cache.get(document_id)
+    if record is None:
+        generation = document_cache.generation()
+        document = await db.scalar(select(Document).filter(
+            Document.id == document_id,
+            Document.is_active == True
+        ))
+        
+        if not document:
+            raise HTTPException(status_code=404, detail="Document not found")
+        record = document_cache.put(document, generation)
+    return record
 
-@router.get("/", response_model=List[dict])
-async def list_documents(
-    category: Optional[str] = Query(None),
-    search: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
-):
-    query = db.query(Document).filter(Document.is_active == True)
+async def get_document_file(document_id: int, db: AsyncSession) -> DocumentRecord:
+    """Like get_active_document, but the file must also be on disk"""
+    document = await get_active_document(document_id, db)
+    if not document.on_disk:
+        raise HTTPException(status_code=404, detail="File not found on disk")
+    return document
+
+async def ensure_content_hash(document: DocumentRecord, resolved_path: str, db: AsyncSession) -> str:
+    """Return the document's content hash, computing it for rows that predate hashing"""
+    if document.content_hash:
+        return document.content_hash
     
-    if category:
+    content_hash = await run_in_threadpool(FileManager().get_file_hash, resolved_path)
+    await db.execute(update(Document).where(Document.id == document.id).values(content_hash=content_hash))
+    await db.commit()
+    get_document_cache().invalidate(document.id)
+    return content_hash
+
+async def ensure_thumbnail_sprite(resolved_path: str, content_hash: str) -> dict:
+    """Return the sprite offset map, building the sprite for documents the queue has not reached"""
+    sprite_map = load_sprite_map(content_hash)
+    if sprite_map is None:
+        image_data, sprite_map = await get_render_executor().generate_thumbnail_sprite(
+            resolved_path, settings.SPRITE_THUMB_HEIGHT, settings.SPRITE_COLUMNS,
+            settings.SPRITE_MAX_PAGES, settings.SPRITE_QUALITY
+        )
+        store_sprite(content_hash, image_data, sprite_map)
+    return sprite_map
+
+async def load_text_layers(document: DocumentRecord, resolved_path: str, db: AsyncSession, words: bool = True,
+                           page: Optional[int] = None) -> List[dict]:
+    """Text layers of a document's pages (or of one ``page``) from the page index.
+
+    Until the processing queue has indexed the document, the pages are
+    extracted on the fly and the document is queued; the index itself is only
+    written by the queue, so requests never race its text stage.
+    """
+    pages_query = select(DocumentPage).filter(DocumentPage.document_id == document.id)
+    if page is not None:
+        pages_query = pages_query.filter(DocumentPage.page_number == page)
+    pages = (await db.scalars(pages_query.order_by(DocumentPage.page_number))).all()
+    
+    # Pages indexed before page sizes were stored count as not indexed
+    if not document.page_count or (pages and pages[0].width is not None):
+        return [text_layer(row, words) for row in pages]
+    
+    extracted = await get_render_executor().extract_page_index(resolved_path, None if page is None else [page - 1])
+    await db.run_sync(lambda session: get_processing_queue().enqueue(document, session))
+    return [extracted_text_layer(layer, words) for layer in extracted]
+
+def text_layer(page: DocumentPage, words: bool = True) -> dict:
+    """Page text plus word boxes as compact ``[x0, y0, x1, y1, word, block, line]`` arrays"""
+    layer = {
+        "page": page.page_number,
+        "width": page.width,
+        "height": page.height,
+        "text": page.text
+    }
+    if words:
+        layer["words"] = SearchIndex.unpack_words(page.words)
+    return layer
+
+def extracted_text_layer(page: dict, words: bool = True) -> dict:
+    """``text_layer`` of a page from ``extract_page_index``"""
+    layer = {key: page[key] for key in ("page", "width", "height", "text")}
+    if words:
+        layer["words"] = page["words"]
+    return layer
+
+def read_file(path: str) -> bytes:
+    with open(path, "rb") as f:
+        return f.read()
+
+SORT_FIELDS = ("upload_date", "original_name", "file_size")
+
+IMAGE_MEDIA_TYPES = {"webp": "image/webp", "png": "image/png", "jpeg": "image/jpeg"}
+
+def negotiate_image_format(accept: str) -> str:
+    """Preview format for an Accept header: PNG unless the client explicitly prefers WebP or JPEG"""
+    weights = {}
+    for item in accept.split(","):
+        media_type, _, params = item.partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        weights[media_type.strip().lower()] = weight
+    
+    # On equal weights, the order of IMAGE_MEDIA_TYPES decides
+    candidates = [
+        (weights[media_type], -rank, image_format)
+        for rank, (image_format, media_type) in enumerate(IMAGE_MEDIA_TYPES.items())
+        if weights.get(media_type, 0) > 0
+    ]
+    return max(candidates)[2] if candidates else "png"
+
+def parse_image_format(image_format: str) -> str:
+    image_format = "jpeg" if image_format.lower() == "jpg" else image_format.lower()
+    if image_format not in IMAGE_MEDIA_TYPES:
+        raise HTTPException(status_code=400, detail=f"Invalid format. Allowed: {', '.join(IMAGE_MEDIA_TYPES)}")
+    return image_format
+
+def parse_page_list(pages: str, page_count: int) -> List[int]:
+    """Pages from a spec like ``1-5,8``, in the order given and without repeats"""
+    selected = []
+    for part in pages.split(","):
+        part = part.strip()
+        if not part:
+            continue
+        first, separator, last = part.partition("-")
         try:
-            category_enum = CategoryEnum(category)
-            query = query.filter(Document.category == category_enum)
+            start = int(first)
+            end = int(last) if separator else start
         except ValueError:
-            raise HTTPException(status_code=400, detail="Invalid category")
+            raise HTTPException(status_code=400, detail=f"Invalid page range: {part}")
+        if start < 1 or end < start or end > page_count:
+            raise HTTPException(status_code=400, detail=f"Page range out of bounds: {part}")
+        for page in range(start, end + 1):
+            if page not in selected:
+                selected.append(page)
+        if len(selected) > settings.PREVIEW_BATCH_MAX_PAGES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"At most {settings.PREVIEW_BATCH_MAX_PAGES} pages per request"
+            )
+    
+    if not selected:
+        raise HTTPException(status_code=400, detail="No pages requested")
+    return selected
+
+def preview_variant(dpi: int, width: Optional[int], grayscale: bool, image_format: str, quality: int) -> str:
+    """Page cache variant of a preview; plain PNGs keep the bare DPI used by prerendering"""
+    variant = f"w{width}" if width else str(dpi)
+    if grayscale:
+        variant += "g"
+    if image_format != "png":
+        variant += f"q{quality}"
+    return variant
+
+def sort_expression(sort: str):
+    column = getattr(Document, sort)
+    if sort == "upload_date" and is_sqlite():
+        # SQLite keeps DateTime as text, with or without microseconds depending on
+        # who wrote the row; compare the stored text so keyset filters match ORDER BY
+        return type_coerce(column, String)
+    return column
+
+def has_tag(tag: str):
+    """Exact tag match through the document_tags index instead of LIKE on the tags string"""
+    return select(DocumentTag.document_id).where(
+        DocumentTag.document_id == Document.id,
+        DocumentTag.tag == tag.strip().lower()
+    ).exists()
+
+async def listing_last_modified(db: AsyncSession, category_enum: Optional[CategoryEnum]) -> Optional[str]:
+    """HTTP date of the newest upload or change in a category.
+
+    Inactive rows count too: deleting a document bumps its ``last_accessed``,
+    so removals move the date as well as additions and rescans.
+    """
+    query = select(func.max(Document.upload_date), func.max(Document.last_accessed))
+    if category_enum:
+        query = query.filter(Document.category == category_enum)
+    newest = [value for value in (await db.execute(query)).one() if value is not None]
+    if not newest:
+        return None
+    # Stored as naive UTC on SQLite
+    newest = [value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value for value in newest]
+    return format_datetime(max(newest).astimezone(timezone.utc), usegmt=True)
+
+async def list_documents_page(
+    request: Request,
+    db: AsyncSession,
+    category_enum: Optional[CategoryEnum],
+    search: Optional[str],
+    tags: Optional[List[str]],
+    limit: Optional[int],
+    cursor: Optional[str],
+    fields: Optional[str],
+    sort: str,
+    order: str,
+    include_total: bool
+) -> Response:
+    """Keyset-paginated, projected document listing shared by the list endpoints.
+
+    The body stays a plain list; ``X-Total-Count`` and ``X-Next-Cursor`` (plus a
+    ``Link: rel="next"``) headers carry the paging state. Rows are turned into
+    dicts and encoded with orjson directly, skipping FastAPI's jsonable_encoder.
+    Responses carry an ETag and Last-Modified and answer revalidation with 304;
+    a matching If-Modified-Since alone is answered before the listing query runs.
+    """
+    if sort not in SORT_FIELDS:
+        raise HTTPException(status_code=400, detail=f"Invalid sort field. Allowed: {', '.join(SORT_FIELDS)}")
+    if order not in ("asc", "desc"):
+        raise HTTPException(status_code=400, detail="Invalid order. Allowed: asc, desc")
+    
+    output_fields = Document.SERIALIZABLE_FIELDS
+    if fields:
+        output_fields = [field.strip() for field in fields.split(",") if field.strip()]
+        unknown = [field for field in output_fields if field not in Document.SERIALIZABLE_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    
+    sort_key = sort_expression(sort)
+    query = select(
+        *[getattr(Document, field) for field in output_fields],
+        sort_key.label("_sort_key"),
+        Document.id.label("_id")
+    ).filter(Document.is_active == True)
+    
+    if category_enum:
+        query = query.filter(Document.category == category_enum)
     
     if search:
         query = query.filter(
@@ -43,166 +272,512 @@ async def list_documents(
             Document.tags.contains(search)
         )
     
-    documents = query.order_by(Document.upload_date.desc()).all()
-    return [doc.to_dict() for doc in documents]
+    for tag in tags or []:
+        query = query.filter(has_tag(tag))
+    
+    headers = {"Cache-Control": "private, no-cache"}
+    last_modified = await listing_last_modified(db, category_enum)
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+        if "if-none-match" not in request.headers and is_not_modified(request.headers, None, last_modified):
+            return Response(status_code=304, headers=headers)
+    
+    if include_total:
+        headers["X-Total-Count"] = str(await db.scalar(query.with_only_columns(func.count(Document.id))))
+    
+    if cursor:
+        position = decode_cursor(cursor, sort, order)
+        if position is None:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        value, last_id = position
+        if order == "desc":
+            query = query.filter((sort_key < value) | ((sort_key == value) & (Document.id < last_id)))
+        else:
+            query = query.filter((sort_key > value) | ((sort_key == value) & (Document.id > last_id)))
+    
+    if order == "desc":
+        query = query.order_by(sort_key.desc(), Document.id.desc())
+    else:
+        query = query.order_by(sort_key.asc(), Document.id.asc())
+    
+    if limit:
+        rows = (await db.execute(query.limit(limit + 1))).all()
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(sort, order, rows[-1]._sort_key, rows[-1]._id)
+            headers["X-Next-Cursor"] = next_cursor
+            headers["Link"] = f'<?cursor={next_cursor}>; rel="next"'
+    else:
+        rows = (await db.execute(query)).all()
+    
+    response = ORJSONResponse(Document.serialize_rows(output_fields, rows), headers=headers)
+    # The paging headers are part of what a 304 confirms, so they go into the tag too
+    fingerprint = hashlib.blake2b(response.body, digest_size=16)
+    fingerprint.update(f"{headers.get('X-Total-Count')}|{headers.get('X-Next-Cursor')}".encode("utf-8"))
+    response.headers["ETag"] = f'"{fingerprint.hexdigest()}"'
+    
+    if is_not_modified(request.headers, response.headers["ETag"], last_modified):
+        not_modified_headers = {key: headers[key] for key in ("Cache-Control", "Last-Modified") if key in headers}
+        return Response(status_code=304, headers={**not_modified_headers, "ETag": response.headers["ETag"]})
+    return response
+
+@router.get("/", response_model=List[dict])
+async def list_documents(
+    request: Request,
+    category: Optional[str] = Query(None),
+    search: Optional[str] = Query(None),
+    tag: Optional[List[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=settings.DOCUMENT_LIST_MAX_LIMIT),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),
+    sort: str = Query("upload_date"),
+    order: str = Query("desc"),
+    include_total: bool = Query(True),
+    db: AsyncSession = Depends(get_async_db)
+):
+    category_enum = None
+    if category:
+        try:
+            category_enum = CategoryEnum(category)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid category")
+    
+    return await list_documents_page(request, db, category_enum, search, tag, limit, cursor, fields, sort, order, include_total)
 
 @router.get("/{category}")
 async def list_documents_by_category(
     category: str,
-    db: Session = Depends(get_db)
+    request: Request,
+    tag: Optional[List[str]] = Query(None),
+    limit: Optional[int] = Query(None, ge=1, le=settings.DOCUMENT_LIST_MAX_LIMIT),
+    cursor: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None),
+    sort: str = Query("upload_date"),
+    order: str = Query("desc"),
+    include_total: bool = Query(True),
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         category_enum = CategoryEnum(category)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid category")
     
-    documents = db.query(Document).filter(
-        Document.category == category_enum,
-        Document.is_active == True
-    ).order_by(Document.upload_date.desc()).all()
-    
-    return [doc.to_dict() for doc in documents]
+    return await list_documents_page(request, db, category_enum, None, tag, limit, cursor, fields, sort, order, include_total)
 
 @router.get("/doc/{document_id}")
-async def get_document(document_id: int, db: Session = Depends(get_db)):
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.is_active == True
-    ).first()
-    
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
-    
-    return document.to_dict()
+async def get_document(document_id: int, db: AsyncSession = Depends(get_async_db)):
+    document = await get_active_document(document_id, db)
+    return document.data
 
 @router.get("/doc/{document_id}/content")
-async def get_document_content(document_id: int, db: Session = Depends(get_db)):
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.is_active == True
-    ).first()
-    
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
-    
-    resolved_path = resolve_file_path(document.file_path)
-    if not os.path.exists(resolved_path):
-        raise HTTPException(status_code=404, detail="File not found on disk")
+async def get_document_content(document_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    document = await get_document_file(document_id, db)
+    resolved_path = document.resolved_path
     
-    return FileResponse(
+    # Strong validator: the stored bytes are identified by their SHA-256
+    content_hash = await ensure_content_hash(document, resolved_path, db)
+    return RangeFileResponse(
         resolved_path,
+        request,
+        etag=f'"{content_hash}"',
         media_type="application/pdf",
-        filename=document.original_name
+        filename=document.original_name,
+        headers={"Cache-Control": "private, no-cache"}
     )
 
 @router.get("/doc/{document_id}/preview/{page}")
 async def get_document_preview(
     document_id: int, 
     page: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    dpi: int = Query(150, ge=settings.PREVIEW_MIN_DPI, le=settings.PREVIEW_MAX_DPI),
+    width: Optional[int] = Query(None, ge=1, le=settings.PREVIEW_MAX_WIDTH),
+    grayscale: bool = Query(False),
+    image_format: Optional[str] = Query(None, alias="format"),
+    quality: int = Query(80, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.is_active == True
-    ).first()
+    document = await get_document_file(document_id, db)
+    resolved_path = document.resolved_path
+    if page < 1 or (document.page_count and page > document.page_count):
+        raise HTTPException(status_code=404, detail=f"Page {page} does not exist")
     
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
+    headers = {"Cache-Control": "private, no-cache"}
+    if image_format:
+        image_format = parse_image_format(image_format)
+    else:
+        image_format = negotiate_image_format(request.headers.get("accept", ""))
+        headers["Vary"] = "Accept"
+    media_type = IMAGE_MEDIA_TYPES[image_format]
     
-    resolved_path = resolve_file_path(document.file_path)
-    if not os.path.exists(resolved_path):
-        raise HTTPException(status_code=404, detail="File not found on disk")
+    content_hash = await ensure_content_hash(document, resolved_path, db)
+    page_cache = get_page_cache()
+    variant = preview_variant(dpi, width, grayscale, image_format, quality)
+    etag = page_cache.etag(content_hash, page, variant, image_format)
+    headers["ETag"] = etag
+    
+    if is_not_modified(request.headers, etag, None):
+        return Response(status_code=304, headers=headers)
     
-    pdf_processor = PDFProcessor()
+    cached_path = page_cache.get(content_hash, page, variant, image_format)
+    if cached_path:
+        return FileResponse(cached_path, media_type=media_type, headers=headers)
+    
+    render_executor = get_render_executor()
     try:
-        image_data = pdf_processor.generate_page_image(resolved_path, page - 1)
-        return StreamingResponse(
-            image_data,
-            media_type="image/png"
+        image_data = (await render_executor.generate_page_image(
+            resolved_path, page - 1, dpi, width, grayscale, image_format, quality
+        )).getvalue()
+        page_cache.put(content_hash, page, variant, image_format, image_data)
+        return Response(
+            content=image_data,
+            media_type=media_type,
+            headers=headers
         )
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating preview: {str(e)}")
 
+@router.get("/doc/{document_id}/previews")
+async def get_document_previews(
+    document_id: int,
+    request: Request,
+    pages: str = Query(..., description="Pages and ranges, e.g. 1-5,8"),
+    dpi: int = Query(150, ge=settings.PREVIEW_MIN_DPI, le=settings.PREVIEW_MAX_DPI),
+    width: Optional[int] = Query(None, ge=1, le=settings.PREVIEW_MAX_WIDTH),
+    grayscale: bool = Query(False),
+    image_format: str = Query("png", alias="format"),
+    quality: int = Query(80, ge=1, le=100),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Several previews of one document in one response.
+
+    Streams ``multipart/mixed`` (one part per page, in request order) or, when
+    the client accepts ``application/json``, a JSON envelope with base64 images.
+    Cached pages are served from the page cache; the rest are rendered in
+    chunks that run in parallel on the process render pool.
+    """
+    document = await get_document_file(document_id, db)
+    resolved_path = document.resolved_path
+    
+    image_format = parse_image_format(image_format)
+    media_type = IMAGE_MEDIA_TYPES[image_format]
+    render_executor = get_render_executor()
+    page_count = document.page_count or await render_executor.get_page_count(resolved_path)
+    selected = parse_page_list(pages, page_count)
+    
+    content_hash = await ensure_content_hash(document, resolved_path, db)
+    page_cache = get_page_cache()
+    variant = preview_variant(dpi, width, grayscale, image_format, quality)
+    
+    cached = {page: page_cache.get(content_hash, page, variant, image_format) for page in selected}
+    missing = [page for page in selected if not cached[page]]
+    chunk_size = settings.PREVIEW_BATCH_CHUNK_PAGES
+    chunks = [missing[i:i + chunk_size] for i in range(0, len(missing), chunk_size)]
+    
+    async def render_chunk(chunk: List[int]) -> dict:
+        images = await render_executor.generate_page_images(
+            resolved_path, [page - 1 for page in chunk], dpi, width, grayscale, image_format, quality
+        )
+        for page, image_data in zip(chunk, images):
+            page_cache.put(content_hash, page, variant, image_format, image_data)
+        return dict(zip(chunk, images))
+    
+    # All chunks start now; results are awaited in page order below
+    tasks = {chunk[0]: asyncio.ensure_future(render_chunk(chunk)) for chunk in chunks}
+    for task in tasks.values():
+        # Collect failures of chunks nobody waits for (e.g. the client went away)
+        task.add_done_callback(lambda done: done.cancelled() or done.exception())
+    chunk_of = {page: chunk[0] for chunk in chunks for page in chunk}
+    
+    async def page_images():
+        try:
+            for page in selected:
+                if cached[page]:
+                    image_data = await run_in_threadpool(read_file, cached[page])
+                else:
+                    image_data = (await tasks[chunk_of[page]])[page]
+                yield page, page_cache.etag(content_hash, page, variant, image_format), image_data
+        finally:
+            for task in tasks.values():
+                task.cancel()
+    
+    if "application/json" in request.headers.get("accept", ""):
+        try:
+            entries = [
+                {
+                    "page": page,
+                    "media_type": media_type,
+                    "etag": etag,
+                    "data": base64.b64encode(image_data).decode("ascii")
+                }
+                async for page, etag, image_data in page_images()
+            ]
+        except HTTPException:
+            raise
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Error generating previews: {str(e)}")
+        return {"document_id": document_id, "pages": entries}
+    
+    boundary = uuid.uuid4().hex
+    
+    async def multipart_body():
+        async for page, etag, image_data in page_images():
+            yield (
+                f"--{boundary}\r\n"
+                f"Content-Type: {media_type}\r\n"
+                f"Content-Length: {len(image_data)}\r\n"
+                f"X-Page: {page}\r\n"
+                f"ETag: {etag}\r\n\r\n"
+            ).encode("latin-1") + image_data + b"\r\n"
+        yield f"--{boundary}--\r\n".encode("latin-1")
+    
+    return StreamingResponse(
+        multipart_body(),
+        media_type=f"multipart/mixed; boundary={boundary}",
+        headers={"Cache-Control": "private, no-cache"}
+    )
+
+@router.get("/doc/{document_id}/tiles/{page}")
+async def get_page_tile_grid(document_id: int, page: int, db: AsyncSession = Depends(get_async_db)):
+    """Tile pyramid of a page: level 0 fits the page in one tile, each level doubles the resolution"""
+    document = await get_document_file(document_id, db)
+    resolved_path = document.resolved_path
+    
+    try:
+        width, height = await get_render_executor().get_page_size(resolved_path, page - 1)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    
+    return {
+        "page": page,
+        "width": width,
+        "height": height,
+        "tile_size": settings.TILE_SIZE,
+        "max_zoom": settings.TILE_MAX_ZOOM,
+        "levels": [
+            PDFProcessor.tile_grid(width, height, zoom, settings.TILE_SIZE)
+            for zoom in range(settings.TILE_MAX_ZOOM + 1)
+        ]
+    }
+
+@router.get("/doc/{document_id}/tiles/{page}/{zoom}/{x}/{y}")
+async def get_page_tile(
+    document_id: int,
+    page: int,
+    x: int,
+    y: int,
+    request: Request,
+    zoom: int = Path(..., ge=0, le=settings.TILE_MAX_ZOOM),
+    db: AsyncSession = Depends(get_async_db)
+):
+    document = await get_document_file(document_id, db)
+    resolved_path = document.resolved_path
+    
+    content_hash = await ensure_content_hash(document, resolved_path, db)
+    page_cache = get_page_cache()
+    variant = tile_variant(zoom, x, y)
+    etag = page_cache.etag(content_hash, page, variant, "png")
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if is_not_modified(request.headers, etag, None):
+        return Response(status_code=304, headers=headers)
+    
+    get_tile_prefetcher().schedule(resolved_path, content_hash, page, zoom, x, y)
+    
+    cached_path = page_cache.get(content_hash, page, variant, "png")
+    if cached_path:
+        return FileResponse(cached_path, media_type="image/png", headers=headers)
+    
+    try:
+        image_data = await get_render_executor().generate_page_tile(
+            resolved_path, page - 1, zoom, x, y, settings.TILE_SIZE
+        )
+        page_cache.put(content_hash, page, variant, "png", image_data)
+        return Response(content=image_data, media_type="image/png", headers=headers)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error generating tile: {str(e)}")
+
+@router.get("/doc/{document_id}/thumbnails")
+async def get_thumbnail_map(document_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    """Offset map of the document's thumbnail sprite: one box per page, in page order"""
+    document = await get_document_file(document_id, db)
+    resolved_path = document.resolved_path
+    
+    content_hash = await ensure_content_hash(document, resolved_path, db)
+    page_cache = get_page_cache()
+    variant = sprite_variant()
+    etag = page_cache.etag(content_hash, SPRITE_PAGE, variant, "json")
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if is_not_modified(request.headers, etag, None):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        sprite_map = await ensure_thumbnail_sprite(resolved_path, content_hash)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    return JSONResponse(
+        content={
+            **sprite_map,
+            "document_id": document.id,
+            "sprite_url": f"/api/documents/doc/{document.id}/thumbnails/sprite",
+            "sprite_etag": page_cache.etag(content_hash, SPRITE_PAGE, variant, "jpeg")
+        },
+        headers=headers
+    )
+
+@router.get("/doc/{document_id}/thumbnails/sprite")
+async def get_thumbnail_sprite(document_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    document = await get_document_file(document_id, db)
+    resolved_path = document.resolved_path
+    
+    content_hash = await ensure_content_hash(document, resolved_path, db)
+    page_cache = get_page_cache()
+    variant = sprite_variant()
+    etag = page_cache.etag(content_hash, SPRITE_PAGE, variant, "jpeg")
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if is_not_modified(request.headers, etag, None):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        await ensure_thumbnail_sprite(resolved_path, content_hash)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+    
+    cached_path = page_cache.get(content_hash, SPRITE_PAGE, variant, "jpeg")
+    if cached_path is None:
+        raise HTTPException(status_code=500, detail="Thumbnail sprite was evicted from the cache")
+    return FileResponse(cached_path, media_type="image/jpeg", headers=headers)
+
 @router.get("/doc/{document_id}/search/{search_term}")
 async def search_in_document(
     document_id: int,
     search_term: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.is_active == True
-    ).first()
+    document = await get_document_file(document_id, db)
+    resolved_path = document.resolved_path
     
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
-    
-    resolved_path = resolve_file_path(document.file_path)
-    if not os.path.exists(resolved_path):
-        raise HTTPException(status_code=404, detail="File not found on disk")
-    
-    pdf_processor = PDFProcessor()
+    render_executor = get_render_executor()
     try:
-        search_results = pdf_processor.search_text_in_pdf(resolved_path, search_term)
+        search_results = await render_executor.search_text_in_pdf(resolved_path, search_term)
         return {
             "document_id": document_id,
             "search_term": search_term,
             "results": search_results,
             "total_matches": sum(result["matches"] for result in search_results)
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search failed: {str(e)}")
 
+@router.get("/doc/{document_id}/text")
+async def get_document_text(
+    document_id: int,
+    request: Request,
+    words: bool = Query(True, description="Include word boxes"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Text layer of every page, read from the page index"""
+    document = await get_document_file(document_id, db)
+    resolved_path = document.resolved_path
+    
+    content_hash = await ensure_content_hash(document, resolved_path, db)
+    etag = get_page_cache().etag(content_hash, 0, "text" if words else "plaintext", "json")
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    
+    if is_not_modified(request.headers, etag, None):
+        return Response(status_code=304, headers=headers)
+    
+    try:
+        pages = await load_text_layers(document, resolved_path, db, words)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Text extraction failed: {str(e)}")
+    
+    return JSONResponse(
+        content={
+            "document_id": document_id,
+            "page_count": len(pages),
+            "pages": pages
+        },
+        headers=headers
+    )
+
 @router.get("/doc/{document_id}/text/{page}")
 async def get_page_text(
     document_id: int,
     page: int,
-    db: Session = Depends(get_db)
+    request: Request,
+    db: AsyncSession = Depends(get_async_db)
 ):
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.is_active == True
-    ).first()
+    document = await get_document_file(document_id, db)
+    resolved_path = document.resolved_path
+    if page < 1 or (document.page_count and page > document.page_count):
+        raise HTTPException(status_code=404, detail=f"Page {page} does not exist")
     
-    if not document:
-        raise HTTPException(status_code=404, detail="Document not found")
+    content_hash = await ensure_content_hash(document, resolved_path, db)
+    etag = get_page_cache().etag(content_hash, page, "text", "json")
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
     
-    resolved_path = resolve_file_path(document.file_path)
-    if not os.path.exists(resolved_path):
-        raise HTTPException(status_code=404, detail="File not found on disk")
+    if is_not_modified(request.headers, etag, None):
+        return Response(status_code=304, headers=headers)
     
-    pdf_processor = PDFProcessor()
     try:
-        text = pdf_processor.extract_text_from_page(resolved_path, page - 1)
-        return {
-            "document_id": document_id,
-            "page": page,
-            "text": text
-        }
+        pages = await load_text_layers(document, resolved_path, db, page=page)
+    except HTTPException:
+        raise
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Text extraction failed: {str(e)}")
+    
+    if not pages:
+        raise HTTPException(status_code=404, detail=f"Page {page} does not exist")
+    
+    return JSONResponse(content={"document_id": document_id, **pages[0]}, headers=headers)
 
 @router.delete("/doc/{document_id}")
-async def delete_document(document_id: int, db: Session = Depends(get_db)):
-    document = db.query(Document).filter(
+async def delete_document(document_id: int, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(update(Document).where(
         Document.id == document_id,
         Document.is_active == True
-    ).first()
+    ).values(is_active=False))
     
-    if not document:
+    if not result.rowcount:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    document.is_active = False
-    db.commit()
+    await db.commit()
+    get_document_cache().invalidate(document_id)
     
     return {"message": "Document deleted successfully"}
 
 @router.post("/scan-directories")
-async def scan_directories(db: Session = Depends(get_db)):
+async def scan_directories():
     """Scan all category directories for new PDF files"""
+    scan_scheduler = get_scan_scheduler()
     try:
-        scanner = DirectoryScanner()
-        results = scanner.scan_all_directories(db)
+        results = await run_in_threadpool(scan_scheduler.run_scan)
         
         return {
             "message": "Directory scan completed",
@@ -213,15 +788,17 @@ async def scan_directories(db: Session = Depends(get_db)):
                 "errors": len(results['errors'])
             }
         }
+    except ScanInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Directory scan failed: {str(e)}")
 
 @router.post("/scan-directories/{category}")
-async def scan_category_directory(category: str, db: Session = Depends(get_db)):
+async def scan_category_directory(category: str):
     """Scan a specific category directory for new PDF files"""
+    scan_scheduler = get_scan_scheduler()
     try:
-        scanner = DirectoryScanner()
-        results = scanner.scan_category_directory(category, db)
+        results = await run_in_threadpool(scan_scheduler.run_scan, [category])
         
         return {
             "message": f"Category {category} scan completed",
@@ -232,51 +809,37 @@ async def scan_category_directory(category: str, db: Session = Depends(get_db)):
                 "errors": len(results['errors'])
             }
         }
+    except ScanInProgressError as e:
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Category scan failed: {str(e)}")
 
+def run_content_search(search_term: str, category: Optional[CategoryEnum], limit: int) -> dict:
+    # Ranking and snippet building are CPU bound, so the whole search runs in
+    # the threadpool on its own sync session rather than on the event loop
+    db = SessionLocal()
+    try:
+        return SearchIndex().search(search_term, db, category, limit)
+    finally:
+        db.close()
+
 @router.get("/search-content/{search_term}")
 async def search_all_documents_content(
     search_term: str,
     category: Optional[str] = Query(None),
-    db: Session = Depends(get_db)
+    limit: int = Query(settings.SEARCH_DEFAULT_LIMIT, ge=1, le=settings.SEARCH_MAX_LIMIT)
 ):
-    """Search for text content across all PDF documents"""
+    """Ranked search over the text of all documents; supports AND/OR/NOT, "phrases", prefix* and fuzzy~ terms"""
+    category_enum = None
+    if category:
+        try:
+            category_enum = CategoryEnum(category)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid category")
+    
     try:
-        query = db.query(Document).filter(Document.is_active == True)
-        
-        if category:
-            try:
-                category_enum = CategoryEnum(category)
-                query = query.filter(Document.category == category_enum)
-            except ValueError:
-                raise HTTPException(status_code=400, detail="Invalid category")
-        
-        documents = query.all()
-        search_results = []
-        pdf_processor = PDFProcessor()
-        
-        for document in documents:
-            resolved_path = resolve_file_path(document.file_path)
-            if os.path.exists(resolved_path):
-                try:
-                    results = pdf_processor.search_text_in_pdf(resolved_path, search_term)
-                    if results:  # Only include documents with matches
-                        search_results.append({
-                            "document": document.to_dict(),
-                            "search_results": results,
-                            "total_matches": sum(result["matches"] for result in results)
-                        })
-                except Exception as e:
-                    print(f"Error searching in document {document.id}: {str(e)}")
-                    continue
-        
-        return {
-            "search_term": search_term,
-            "documents_searched": len(documents),
-            "documents_with_matches": len(search_results),
-            "results": search_results,
-            "total_matches": sum(doc["total_matches"] for doc in search_results)
-        }
+        return ORJSONResponse(await run_in_threadpool(run_content_search, search_term, category_enum, limit))
+    except QuerySyntaxError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Content search failed: {str(e)}")
\ No newline at end of file
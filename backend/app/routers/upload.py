@@ -1,20 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form
-from fastapi.responses import JSONResponse
-from sqlalchemy.orm import Session
-from typing import List
+from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, Query, Request
+from fastapi.responses import JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import ClientDisconnect
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from contextlib import asynccontextmanager
+from typing import Dict, List
+import asyncio
 import os
 import uuid
 import shutil
-from datetime import datetime
+from datetime import datetime, timedelta
 
-from app.database.connection import get_db
+from app.database.connection import get_async_db
 from app.models.document import Document, CategoryEnum
-from app.services.pdf_processor import PDFProcessor
-from app.services.file_manager import FileManager
+from app.models.upload_session import UploadSession, UploadSessionStatus
+from app.services.document_cache import get_document_cache
+from app.services.render_executor import get_render_executor
+from app.services.file_manager import FileManager, InvalidUploadError, UPLOAD_CHUNK_SIZE, compute_file_hash
+from app.services.processing_queue import get_processing_queue
+from app.utils.paths import resolve_file_path
 from config import settings
 
 router = APIRouter()
 
+async def find_duplicates(content_hashes: List[str], category_enum: CategoryEnum, db: AsyncSession) -> Dict[str, Document]:
+    """Active documents of a category already stored with the given contents, if their files are still on disk.
+    
+    The same file uploaded to another category is a new document with its own metadata.
+    """
+    duplicates = {}
+    if not content_hashes:
+        return duplicates
+    
+    content_hashes = set(content_hashes)
+    documents = (await db.scalars(select(Document).filter(
+        Document.content_hash.in_(content_hashes) | Document.upload_hash.in_(content_hashes),
+        Document.category == category_enum,
+        Document.is_active == True
+    ).order_by(Document.id))).all()
+    
+    for document in documents:
+        if not os.path.exists(resolve_file_path(document.file_path)):
+            continue
+        for content_hash in (document.content_hash, document.upload_hash):
+            if content_hash in content_hashes and content_hash not in duplicates:
+                duplicates[content_hash] = document
+    return duplicates
+
+async def linearize_upload(file_path: str, received: dict) -> dict:
+    """Linearize a received PDF for fast first-page display, updating its size and hash"""
+    if not settings.LINEARIZE_UPLOADS:
+        return received
+    try:
+        if not await get_render_executor().linearize(file_path):
+            return received
+    except HTTPException:
+        # Only an optimisation; never fail an upload because the render pool is busy
+        return received
+    
+    return {
+        **received,
+        "file_size": os.path.getsize(file_path),
+        "content_hash": await run_in_threadpool(compute_file_hash, file_path),
+        "upload_hash": received["content_hash"]
+    }
+
+def error_message(e: Exception) -> str:
+    return e.detail if isinstance(e, HTTPException) else str(e)
+
 @router.post("/")
 async def upload_documents(
     files: List[UploadFile] = File(...),
@@ -23,73 +77,218 @@ async def upload_documents(
     tags: str = Form(""),
     classification_level: str = Form(""),
     created_by: str = Form("System"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
+    """Bulk ingestion: files are received and opened concurrently, rows are inserted in one transaction"""
     try:
         category_enum = CategoryEnum(category)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid category")
     
     file_manager = FileManager()
-    pdf_processor = PDFProcessor()
+    render_executor = get_render_executor()
+    processing_queue = get_processing_queue()
+    upload_id = str(uuid.uuid4())
+    # Keeps the render pool under its queue limit however many files are posted
+    semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+    
+    # Per-file outcome in request order: (status, payload)
+    outcomes = [None] * len(files)
+    
+    async def receive(file: UploadFile) -> dict:
+        if not file.filename.lower().endswith('.pdf'):
+            raise InvalidUploadError("Only PDF files are allowed")
+        async with semaphore:
+            return await run_in_threadpool(file_manager.receive_upload, file.file, category)
+    
+    received = await asyncio.gather(*[receive(file) for file in files], return_exceptions=True)
+    
+    duplicates = await find_duplicates([r["content_hash"] for r in received if isinstance(r, dict)], category_enum, db)
+    first_in_batch: Dict[str, int] = {}
+    stored = []
+    for i, (file, result) in enumerate(zip(files, received)):
+        if isinstance(result, Exception):
+            outcomes[i] = ("error", error_message(result))
+            continue
+        
+        content_hash = result["content_hash"]
+        if content_hash in duplicates or content_hash in first_in_batch:
+            file_manager.delete_file(result["temp_path"])
+            outcomes[i] = ("duplicate", duplicates.get(content_hash) or first_in_batch[content_hash])
+            continue
+        
+        first_in_batch[content_hash] = i
+        unique_filename = f"{uuid.uuid4()}_{file.filename}"
+        file_path = file_manager.commit_upload(result["temp_path"], category, unique_filename)
+        stored.append((i, unique_filename, file_path, result))
+    
+    async def prepare(file_path: str, result: dict) -> tuple:
+        async with semaphore:
+            file_metadata = await render_executor.extract_metadata(file_path)
+            return file_metadata, await linearize_upload(file_path, result)
+    
+    prepared = await asyncio.gather(*[prepare(entry[2], entry[3]) for entry in stored], return_exceptions=True)
+    
+    documents = []
+    for (i, unique_filename, file_path, _), outcome in zip(stored, prepared):
+        if isinstance(outcome, Exception):
+            os.remove(file_path)
+            outcomes[i] = ("error", f"Error processing PDF - {error_message(outcome)}")
+            continue
+        
+        file_metadata, result = outcome
+        document = Document(
+            filename=unique_filename,
+            original_name=files[i].filename,
+            category=category_enum,
+            file_path=file_path,
+            file_size=result["file_size"],
+            content_hash=result["content_hash"],
+            upload_hash=result.get("upload_hash"),
+            page_count=file_metadata["page_count"],
+            description=description,
+            classification_level=classification_level,
+            created_by=created_by
+        )
+        document.set_tags(tags)
+        documents.append(document)
+        outcomes[i] = ("success", document)
+    
+    try:
+        db.add_all(documents)
+        await db.flush()
+        
+        # Copies of a file stored earlier in this batch point at that new document
+        for i, outcome in enumerate(outcomes):
+            if outcome[0] == "duplicate" and isinstance(outcome[1], int):
+                source = outcomes[outcome[1]]
+                outcomes[i] = ("duplicate", source[1]) if source[0] == "success" else source
+        
+        duplicate_documents = [outcome[1] for outcome in outcomes if outcome[0] == "duplicate"]
+        # The queue is shared with the sync workers, so it runs on the session's sync facade
+        await db.run_sync(lambda session: processing_queue.record_duplicates(
+            duplicate_documents, session, upload_id, commit=False
+        ))
+        await db.run_sync(lambda session: processing_queue.enqueue_many(documents, session, upload_id, commit=False))
+        await db.commit()
+    except Exception as e:
+        # Nothing was committed, so none of the stored files is referenced
+        await db.rollback()
+        for document in documents:
+            file_manager.delete_file(document.file_path)
+        outcomes = [
+            ("error", str(e)) if outcome[0] in ("success", "duplicate") else outcome
+            for outcome in outcomes
+        ]
+    
+    else:
+        processing_queue.notify()
+    
     uploaded_files = []
     errors = []
-    
-    for file in files:
-        try:
-            if not file.filename.lower().endswith('.pdf'):
-                errors.append(f"{file.filename}: Only PDF files are allowed")
-                continue
-            
-            if file.size > settings.UPLOAD_MAX_SIZE:
-                errors.append(f"{file.filename}: File size exceeds maximum limit")
-                continue
-            
-            unique_filename = f"{uuid.uuid4()}_{file.filename}"
-            file_path = file_manager.save_file(file, category, unique_filename)
-            
-            try:
-                metadata = pdf_processor.extract_metadata(file_path)
-                page_count = metadata["page_count"]
-            except Exception as e:
-                os.remove(file_path)
-                errors.append(f"{file.filename}: Error processing PDF - {str(e)}")
-                continue
-            
-            document = Document(
-                filename=unique_filename,
-                original_name=file.filename,
-                category=category_enum,
-                file_path=file_path,
-                file_size=file.size,
-                page_count=page_count,
-                description=description,
-                tags=tags,
-                classification_level=classification_level,
-                created_by=created_by
-            )
-            
-            db.add(document)
-            db.commit()
-            db.refresh(document)
-            
+    for file, (status, payload) in zip(files, outcomes):
+        if status == "error":
+            errors.append(f"{file.filename}: {payload}")
+        elif status == "duplicate":
+            uploaded_files.append({
+                "id": payload.id,
+                "filename": file.filename,
+                "status": "duplicate",
+                "message": "File already uploaded"
+            })
+        else:
             uploaded_files.append({
-                "id": document.id,
-                "filename": document.original_name,
+                "id": payload.id,
+                "filename": payload.original_name,
                 "status": "success",
                 "message": "File uploaded successfully"
             })
-            
-        except Exception as e:
-            errors.append(f"{file.filename}: {str(e)}")
     
     return {
+        "upload_id": upload_id,
         "uploaded_files": uploaded_files,
         "errors": errors,
         "total_uploaded": len(uploaded_files),
         "total_errors": len(errors)
     }
 
+async def ingest_received(
+    received: dict,
+    filename: str,
+    category_enum: CategoryEnum,
+    description: str,
+    tags: str,
+    classification_level: str,
+    created_by: str,
+    upload_id: str,
+    db: AsyncSession
+) -> dict:
+    """Store a fully received upload as a document (or resolve it to an existing copy) and queue it.
+
+    The temp file is removed when the upload is rejected; on other HTTP errors
+    (e.g. a busy render pool) it is left for the caller to retry or discard.
+    """
+    file_manager = FileManager()
+    processing_queue = get_processing_queue()
+    
+    duplicate = (await find_duplicates([received["content_hash"]], category_enum, db)).get(received["content_hash"])
+    if duplicate:
+        file_manager.delete_file(received["temp_path"])
+        await db.run_sync(lambda session: processing_queue.record_duplicates([duplicate], session, upload_id))
+        return {
+            "id": duplicate.id,
+            "upload_id": upload_id,
+            "filename": filename,
+            "status": "duplicate",
+            "message": "File already uploaded",
+            "document": duplicate.to_dict()
+        }
+    
+    try:
+        metadata = await get_render_executor().extract_metadata(received["temp_path"])
+        page_count = metadata["page_count"]
+    except HTTPException:
+        raise
+    except Exception as e:
+        file_manager.delete_file(received["temp_path"])
+        raise HTTPException(status_code=400, detail=f"Error processing PDF: {str(e)}")
+    
+    received = await linearize_upload(received["temp_path"], received)
+    
+    unique_filename = f"{uuid.uuid4()}_{filename}"
+    file_path = file_manager.commit_upload(received["temp_path"], category_enum.value, unique_filename)
+    
+    document = Document(
+        filename=unique_filename,
+        original_name=filename,
+        category=category_enum,
+        file_path=file_path,
+        file_size=received["file_size"],
+        content_hash=received["content_hash"],
+        upload_hash=received.get("upload_hash"),
+        page_count=page_count,
+        description=description,
+        classification_level=classification_level,
+        created_by=created_by
+    )
+    document.set_tags(tags)
+    
+    db.add(document)
+    await db.commit()
+    await db.refresh(document)
+    get_document_cache().put(document)
+    
+    await db.run_sync(lambda session: processing_queue.enqueue(document, session, upload_id))
+    
+    return {
+        "id": document.id,
+        "upload_id": upload_id,
+        "filename": document.original_name,
+        "status": "success",
+        "message": "File uploaded successfully",
+        "document": document.to_dict()
+    }
+
 @router.post("/single")
 async def upload_single_document(
     file: UploadFile = File(...),
@@ -98,7 +297,7 @@ async def upload_single_document(
     tags: str = Form(""),
     classification_level: str = Form(""),
     created_by: str = Form("System"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     try:
         category_enum = CategoryEnum(category)
@@ -108,51 +307,239 @@ async def upload_single_document(
     if not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="Only PDF files are allowed")
     
-    if file.size > settings.UPLOAD_MAX_SIZE:
-        raise HTTPException(status_code=400, detail="File size exceeds maximum limit")
-    
     file_manager = FileManager()
-    pdf_processor = PDFProcessor()
+    upload_id = str(uuid.uuid4())
     
     try:
-        unique_filename = f"{uuid.uuid4()}_{file.filename}"
-        file_path = file_manager.save_file(file, category, unique_filename)
+        try:
+            received = await run_in_threadpool(file_manager.receive_upload, file.file, category)
+        except InvalidUploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
         
         try:
-            metadata = pdf_processor.extract_metadata(file_path)
-            page_count = metadata["page_count"]
-        except Exception as e:
-            os.remove(file_path)
-            raise HTTPException(status_code=400, detail=f"Error processing PDF: {str(e)}")
+            return await ingest_received(
+                received, file.filename, category_enum, description, tags,
+                classification_level, created_by, upload_id, db
+            )
+        except HTTPException:
+            file_manager.delete_file(received["temp_path"])
+            raise
         
-        document = Document(
-            filename=unique_filename,
-            original_name=file.filename,
-            category=category_enum,
-            file_path=file_path,
-            file_size=file.size,
-            page_count=page_count,
-            description=description,
-            tags=tags,
-            classification_level=classification_level,
-            created_by=created_by
-        )
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+# Resumable uploads: POST /sessions, then PUT /sessions/{id}?offset=N with raw
+# bytes until complete (GET the session after a disconnect to learn where to
+# resume), then POST /sessions/{id}/finalize.
+
+_session_locks: Dict[str, list] = {}  # upload_id -> [lock, requests holding or waiting for it]
+
+@asynccontextmanager
+async def session_lock(upload_id: str):
+    # One writer per session; chunks for the same upload are applied in order.
+    # The lock is dropped when no request holds or waits for it, so only sessions in use have one.
+    entry = _session_locks.setdefault(upload_id, [asyncio.Lock(), 0])
+    entry[1] += 1
+    try:
+        async with entry[0]:
+            yield
+    finally:
+        entry[1] -= 1
+        if not entry[1]:
+            del _session_locks[upload_id]
+
+async def get_open_session(upload_id: str, db: AsyncSession) -> UploadSession:
+    session = await db.get(UploadSession, upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    if session.status != UploadSessionStatus.open:
+        raise HTTPException(status_code=409, detail=f"Upload session is {session.status}")
+    return session
+
+def offset_conflict(session: UploadSession, detail: str) -> HTTPException:
+    return HTTPException(status_code=409, detail=detail, headers={"Upload-Offset": str(session.received_bytes)})
+
+async def expire_sessions(db: AsyncSession):
+    """Drop open sessions that have not received data within the TTL"""
+    cutoff = datetime.utcnow() - timedelta(hours=settings.UPLOAD_SESSION_TTL_HOURS)
+    file_manager = FileManager()
+    stale = (await db.scalars(select(UploadSession).filter(
+        UploadSession.status == UploadSessionStatus.open,
+        UploadSession.updated_at < cutoff
+    ))).all()
+    for session in stale:
+        file_manager.delete_file(session.temp_path)
+        session.status = UploadSessionStatus.aborted
+        session.error = "Expired"
+    if stale:
+        await db.commit()
+
+@router.post("/sessions")
+async def create_upload_session(
+    filename: str = Form(...),
+    category: str = Form(...),
+    total_size: int = Form(..., gt=0),
+    description: str = Form(""),
+    tags: str = Form(""),
+    classification_level: str = Form(""),
+    created_by: str = Form("System"),
+    db: AsyncSession = Depends(get_async_db)
+):
+    try:
+        category_enum = CategoryEnum(category)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid category")
+    
+    if not filename.lower().endswith('.pdf'):
+        raise HTTPException(status_code=400, detail="Only PDF files are allowed")
+    
+    if total_size > settings.UPLOAD_SESSION_MAX_SIZE:
+        raise HTTPException(status_code=400, detail="File size exceeds maximum limit")
+    
+    await expire_sessions(db)
+    
+    upload_id = str(uuid.uuid4())
+    session = UploadSession(
+        id=upload_id,
+        filename=filename,
+        category=category_enum,
+        total_size=total_size,
+        received_bytes=0,
+        temp_path=FileManager().create_session_file(category, upload_id),
+        description=description,
+        tags=tags,
+        classification_level=classification_level,
+        created_by=created_by,
+        status=UploadSessionStatus.open
+    )
+    db.add(session)
+    await db.commit()
+    await db.refresh(session)
+    
+    return {
+        **session.to_dict(),
+        "chunk_size": settings.UPLOAD_SESSION_CHUNK_SIZE,
+        "max_size": settings.UPLOAD_SESSION_MAX_SIZE
+    }
+
+@router.get("/sessions/{upload_id}")
+async def get_upload_session(upload_id: str, response: Response, db: AsyncSession = Depends(get_async_db)):
+    session = await db.get(UploadSession, upload_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Upload session not found")
+    
+    response.headers["Upload-Offset"] = str(session.received_bytes)
+    return session.to_dict()
+
+@router.put("/sessions/{upload_id}")
+async def upload_session_chunk(
+    upload_id: str,
+    request: Request,
+    offset: int = Query(..., ge=0),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Append the raw request body at ``offset``; bytes that arrive before a disconnect are kept"""
+    file_manager = FileManager()
+    
+    async with session_lock(upload_id):
+        session = await get_open_session(upload_id, db)
+        session.received_bytes = file_manager.get_file_size(session.temp_path)
+        if offset != session.received_bytes:
+            await db.commit()
+            raise offset_conflict(session, f"Expected offset {session.received_bytes}")
         
-        db.add(document)
-        db.commit()
-        db.refresh(document)
+        received = offset
+        pending = bytearray()
         
-        return {
-            "id": document.id,
-            "filename": document.original_name,
-            "status": "success",
-            "message": "File uploaded successfully",
-            "document": document.to_dict()
-        }
+        async def flush():
+            nonlocal received
+            if pending:
+                received = await run_in_threadpool(file_manager.write_chunk, session.temp_path, received, bytes(pending))
+                pending.clear()
         
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+        try:
+            try:
+                async for chunk in request.stream():
+                    if received + len(pending) + len(chunk) > session.total_size:
+                        raise HTTPException(status_code=413, detail="Chunk extends past the declared file size")
+                    pending.extend(chunk)
+                    if len(pending) >= UPLOAD_CHUNK_SIZE:
+                        await flush()
+            except ClientDisconnect:
+                pass
+            await flush()
+        except InvalidUploadError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        finally:
+            session.received_bytes = received
+            await db.commit()
+    
+    return {"upload_id": upload_id, "offset": received, "total_size": session.total_size}
+
+@router.post("/sessions/{upload_id}/finalize")
+async def finalize_upload_session(upload_id: str, db: AsyncSession = Depends(get_async_db)):
+    file_manager = FileManager()
+    
+    async with session_lock(upload_id):
+        session = await get_open_session(upload_id, db)
+        session.received_bytes = file_manager.get_file_size(session.temp_path)
+        if session.received_bytes != session.total_size:
+            await db.commit()
+            raise offset_conflict(
+                session, f"Upload incomplete: {session.received_bytes} of {session.total_size} bytes received"
+            )
+        
+        try:
+            try:
+                received = await run_in_threadpool(file_manager.check_received, session.temp_path)
+            except InvalidUploadError as e:
+                file_manager.delete_file(session.temp_path)
+                raise HTTPException(status_code=400, detail=str(e))
+            
+            result = await ingest_received(
+                received, session.filename, session.category, session.description, session.tags,
+                session.classification_level, session.created_by, upload_id, db
+            )
+        except HTTPException as e:
+            # A busy render pool is retryable: keep the received bytes and the open session
+            if e.status_code != 503:
+                file_manager.delete_file(session.temp_path)
+                session.status = UploadSessionStatus.failed
+                session.error = e.detail
+                await db.commit()
+            raise
+        
+        session.status = UploadSessionStatus.completed
+        session.document_id = result["id"]
+        await db.commit()
+    
+    return result
+
+@router.delete("/sessions/{upload_id}")
+async def abort_upload_session(upload_id: str, db: AsyncSession = Depends(get_async_db)):
+    async with session_lock(upload_id):
+        session = await get_open_session(upload_id, db)
+        FileManager().delete_file(session.temp_path)
+        session.status = UploadSessionStatus.aborted
+        await db.commit()
+    
+    return {"upload_id": upload_id, "status": session.status}
 
 @router.get("/progress/{upload_id}")
-async def get_upload_progress(upload_id: str):
-    return {"upload_id": upload_id, "status": "completed", "progress": 100}
\ No newline at end of file
+async def get_upload_progress(upload_id: str, db: AsyncSession = Depends(get_async_db)):
+    progress = await db.run_sync(lambda session: get_processing_queue().get_upload_progress(upload_id, session))
+    session = await db.get(UploadSession, upload_id)
+    
+    if session is not None:
+        if progress is None:
+            # Still receiving bytes (or the upload never got as far as a document)
+            status = "uploading" if session.status == UploadSessionStatus.open else session.status
+            progress = {"upload_id": upload_id, "status": status, "progress": 0, "documents": []}
+        progress["bytes_received"] = session.received_bytes
+        progress["total_bytes"] = session.total_size
+    
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return progress
\ No newline at end of file
@@ -1,40 +1,93 @@
 import os
+import re
 import uuid
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from typing import List, Dict
+from typing import Callable, List, Dict, Optional
 from sqlalchemy.orm import Session
 
 from app.models.document import Document, CategoryEnum
+from app.models.file_manifest import FileManifest
 from app.services.pdf_processor import PDFProcessor
+from app.services.file_manager import FileManager, compute_file_hash
+from app.services.document_cache import get_document_cache
+from app.services.page_cache import get_page_cache
+from app.services.processing_queue import get_processing_queue
 from config import settings
-import os
+
+# Files saved by the upload routes are named "<uuid4>_<original name>"
+UPLOAD_NAME_PATTERN = re.compile(r"^[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}_")
+
+def is_upload_name(filename: str) -> bool:
+    """Files stored by the upload routes, which register them in the database themselves"""
+    return UPLOAD_NAME_PATTERN.match(filename) is not None
+
+def _inspect_file(file_path: str, known_hash: Optional[str] = None) -> dict:
+    """Hash a PDF and extract metadata unless it still matches ``known_hash``.
+
+    Module level so it can run in a worker process.
+    """
+    content_hash = compute_file_hash(file_path)
+    if content_hash == known_hash:
+        return {"content_hash": content_hash, "changed": False}
+
+    metadata = PDFProcessor().extract_metadata(file_path)
+    return {
+        "content_hash": content_hash,
+        "changed": True,
+        "page_count": metadata.get("page_count", 0)
+    }
 
 class DirectoryScanner:
     def __init__(self):
         self.pdf_processor = PDFProcessor()
+        self.file_manager = FileManager()
         self.categories = ['opord', 'warno', 'intel']
-    
-    def scan_all_directories(self, db: Session) -> Dict[str, List[str]]:
-        """Scan all category directories and return results"""
+        self._executor = None
+
+    def scan_all_directories(self, db: Session, categories: Optional[List[str]] = None,
+                             progress_callback: Optional[Callable[[str, int], None]] = None) -> Dict[str, List[str]]:
+        """Scan all category directories and return results.
+
+        ``progress_callback(category, categories_done)`` is called before each category.
+        """
         results = {
             'added': [],
             'updated': [],
             'errors': []
         }
         
-        for category in self.categories:
-            try:
-                category_results = self.scan_category_directory(category, db)
-                results['added'].extend(category_results['added'])
-                results['updated'].extend(category_results['updated'])
-                results['errors'].extend(category_results['errors'])
-            except Exception as e:
-                results['errors'].append(f"Error scanning {category} directory: {str(e)}")
+        try:
+            for done, category in enumerate(categories or self.categories):
+                if progress_callback:
+                    progress_callback(category, done)
+                try:
+                    category_results = self._scan_category(category, db)
+                    results['added'].extend(category_results['added'])
+                    results['updated'].extend(category_results['updated'])
+                    results['errors'].extend(category_results['errors'])
+                except Exception as e:
+                    results['errors'].append(f"Error scanning {category} directory: {str(e)}")
+        finally:
+            self._shutdown_executor()
         
         return results
     
     def scan_category_directory(self, category: str, db: Session) -> Dict[str, List[str]]:
         """Scan a specific category directory for PDF files"""
+        try:
+            return self._scan_category(category, db)
+        finally:
+            self._shutdown_executor()
+    
+    def _scan_category(self, category: str, db: Session) -> Dict[str, List[str]]:
+        """Scan one category directory without closing the worker pool.
+
+        The directory listing is diffed against the file manifest, so only new
+        or changed files are hashed and opened; that work runs on a process
+        pool and the results are committed in batches.
+        """
         results = {
             'added': [],
             'updated': [],
@@ -43,8 +96,6 @@ class DirectoryScanner:
         
         # Get the absolute path to the category directory
         category_dir = os.path.join(settings.UPLOAD_DIRECTORY, category)
-        # Make it relative to the root directory for database storage
-        relative_category_dir = os.path.join('.', 'uploads', category)
         
         if not os.path.exists(category_dir):
             os.makedirs(category_dir, exist_ok=True)
@@ -56,103 +107,274 @@ class DirectoryScanner:
             results['errors'].append(f"Invalid category: {category}")
             return results
         
-        # Get all PDF files in the directory
-        pdf_files = []
-        for filename in os.listdir(category_dir):
-            if filename.lower().endswith('.pdf'):
-                file_path = os.path.join(category_dir, filename)
+        manifest = {
+            entry.path: entry
+            for entry in db.query(FileManifest).filter(FileManifest.category == category_enum)
+        }
+        documents_by_name = {}
+        for document in db.query(Document).filter(Document.category == category_enum):
+            # Uploaded files are stored under a generated name, scanned ones under their own
+            documents_by_name.setdefault(os.path.basename(document.file_path), document)
+            documents_by_name.setdefault(document.original_name, document)
+        
+        files = []
+        with os.scandir(category_dir) as entries:
+            for entry in entries:
+                if not entry.name.lower().endswith('.pdf') or not entry.is_file():
+                    continue
+                try:
+                    files.append((entry.name, entry.path, entry.stat()))
+                except Exception as e:
+                    results['errors'].append(f"Error processing {category}/{entry.name}: {str(e)}")
+        
+        # An upload moves its files into place before committing their rows; a scan
+        # in between must not register them again as new documents
+        self._sync_entries(category, category_enum, files, manifest, documents_by_name, db, results,
+                           skip_new=is_upload_name)
+        return results
+    
+    def sync_files(self, category: str, filenames: List[str], db: Session) -> Dict[str, List[str]]:
+        """Bring the given files of one category up to date, e.g. after watcher events.
+
+        Files that no longer exist have their documents marked inactive.
+        """
+        results = {
+            'added': [],
+            'updated': [],
+            'removed': [],
+            'errors': []
+        }
+        
+        try:
+            category_enum = CategoryEnum(category)
+        except ValueError:
+            results['errors'].append(f"Invalid category: {category}")
+            return results
+        
+        category_dir = os.path.join(settings.UPLOAD_DIRECTORY, category)
+        relative_category_dir = os.path.join('.', 'uploads', category)
+        relative_paths = [os.path.join(relative_category_dir, filename) for filename in filenames]
+        
+        manifest = {
+            entry.path: entry
+            for entry in db.query(FileManifest).filter(FileManifest.path.in_(relative_paths))
+        }
+        documents_by_name = {}
+        for document in db.query(Document).filter(
+            Document.category == category_enum,
+            Document.original_name.in_(filenames) | Document.file_path.in_(relative_paths)
+        ):
+            documents_by_name.setdefault(os.path.basename(document.file_path), document)
+            documents_by_name.setdefault(document.original_name, document)
+        
+        files = []
+        for filename, relative_file_path in zip(filenames, relative_paths):
+            file_path = os.path.join(category_dir, filename)
+            try:
                 if os.path.isfile(file_path):
-                    pdf_files.append((filename, file_path))
+                    files.append((filename, file_path, os.stat(file_path)))
+                elif self._remove_file(relative_file_path, manifest.get(relative_file_path), documents_by_name.get(filename), db):
+                    results['removed'].append(f"{category}/{filename}")
+            except Exception as e:
+                results['errors'].append(f"Error processing {category}/{filename}: {str(e)}")
+        
+        # New files named by the upload route are registered by that route itself
+        try:
+            self._sync_entries(category, category_enum, files, manifest, documents_by_name, db, results,
+                               skip_new=is_upload_name)
+        finally:
+            self._shutdown_executor()
+        return results
+    
+    def _remove_file(self, relative_file_path: str, manifest_entry: Optional[FileManifest],
+                     document: Optional[Document], db: Session) -> bool:
+        """Forget a vanished file; returns True if an active document was deactivated"""
+        if manifest_entry is not None:
+            if document is None and manifest_entry.document_id is not None:
+                document = db.query(Document).filter(Document.id == manifest_entry.document_id).first()
+            db.delete(manifest_entry)
         
-        for filename, file_path in pdf_files:
+        deactivated = False
+        if document is not None and document.file_path == relative_file_path and document.is_active:
+            document.is_active = False
+            deactivated = True
+        db.commit()
+        if deactivated:
+            get_document_cache().invalidate(document.id)
+        return deactivated
+    
+    def _sync_entries(self, category: str, category_enum: CategoryEnum, files: list, manifest: dict,
+                      documents_by_name: dict, db: Session, results: Dict[str, List[str]],
+                      skip_new: Optional[Callable[[str], bool]] = None):
+        """Diff (filename, path, stat) entries against the manifest and apply the changes"""
+        # Relative to the root directory for database storage
+        relative_category_dir = os.path.join('.', 'uploads', category)
+        pending = []
+        restored = []
+        for filename, file_path, stat in files:
             try:
-                # Create relative path for database storage
                 relative_file_path = os.path.join(relative_category_dir, filename)
+                manifest_entry = manifest.get(relative_file_path)
+                
+                if manifest_entry and manifest_entry.matches(stat.st_size, stat.st_mtime_ns, stat.st_ino):
+                    continue
+                
+                document = documents_by_name.get(filename)
+                if (manifest_entry is None and document is not None and not document.is_active
+                        and document.file_path == relative_file_path):
+                    # Deactivated when its file vanished (which drops the manifest entry) and the
+                    # file is back; documents deleted through the API keep their entry
+                    document.is_active = True
+                    restored.append(document)
+                
+                if manifest_entry is None and document is not None:
+                    # Known document without a manifest entry yet (pre-manifest database)
+                    if stat.st_mtime <= document.upload_date.timestamp():
+                        self._record_manifest(manifest_entry, relative_file_path, category_enum, stat,
+                                              document.content_hash, document.id, db)
+                        if restored and restored[-1] is document:
+                            results['updated'].append(f"{category}/{filename}")
+                        continue
                 
-                # Check if file already exists in database
-                existing_doc = db.query(Document).filter(
-                    Document.original_name == filename,
-                    Document.category == category_enum
-                ).first()
+                if document is None and skip_new and skip_new(filename):
+                    continue
+                
+                pending.append((filename, file_path, relative_file_path, stat, manifest_entry, document))
+            except Exception as e:
+                results['errors'].append(f"Error processing {category}/{filename}: {str(e)}")
+        
+        # Restored documents are reprocessed, since their text and renderings may have been dropped
+        self._commit_batch(restored, db)
+        
+        inspected = self._inspect_files(pending)
+        batch = []
+        for (filename, file_path, relative_file_path, stat, manifest_entry, document), info in zip(pending, inspected):
+            try:
+                if isinstance(info, Exception):
+                    raise info
                 
-                if existing_doc:
-                    # Check if file has been modified
-                    file_stat = os.stat(file_path)
-                    if file_stat.st_mtime > existing_doc.upload_date.timestamp():
-                        # File has been modified, update metadata
-                        self._update_document_metadata(existing_doc, relative_file_path, db)
-                        results['updated'].append(f"{category}/{filename}")
-                else:
-                    # New file, add to database
-                    self._add_document_to_db(filename, relative_file_path, category_enum, db)
-                    results['added'].append(f"{category}/{filename}")
+                # A savepoint per file, so a failed flush drops only this file's changes
+                # and leaves the session usable for the rest of the batch
+                with db.begin_nested():
+                    if document is None:
+                        document = self._add_document_to_db(filename, relative_file_path, category_enum, stat.st_size, info, db)
+                        outcome = 'added'
+                    elif info["changed"]:
+                        self._update_document_metadata(document, stat.st_size, info, db)
+                        outcome = 'updated'
+                    else:
+                        outcome = 'updated' if document in restored else None
                     
+                    db.flush()
+                    self._record_manifest(manifest_entry, relative_file_path, category_enum, stat,
+                                          info["content_hash"], document.id, db)
+                
+                if outcome:
+                    results[outcome].append(f"{category}/{filename}")
+                    batch.append(document)
+                
+                if len(batch) >= settings.SCAN_BATCH_SIZE:
+                    self._commit_batch(batch, db)
+                    batch = []
             except Exception as e:
                 results['errors'].append(f"Error processing {category}/{filename}: {str(e)}")
         
-        return results
+        self._commit_batch(batch, db)
+    
+    def _inspect_files(self, pending: list) -> list:
+        """Hash and extract metadata for new/changed files, in parallel when worthwhile"""
+        jobs = [
+            (file_path, document.content_hash if document else None)
+            for _, file_path, _, _, _, document in pending
+        ]
+        
+        if len(jobs) < settings.SCAN_POOL_MIN_FILES or settings.SCAN_WORKERS <= 1:
+            return [self._inspect_safely(*job) for job in jobs]
+        
+        if self._executor is None:
+            # spawn rather than fork: the parent holds threads and PyMuPDF handles
+            context = multiprocessing.get_context("spawn")
+            self._executor = ProcessPoolExecutor(max_workers=settings.SCAN_WORKERS, mp_context=context)
+        
+        futures = [self._executor.submit(_inspect_file, *job) for job in jobs]
+        inspected = []
+        for future in futures:
+            try:
+                inspected.append(future.result())
+            except Exception as e:
+                inspected.append(e)
+        return inspected
     
-    def _add_document_to_db(self, filename: str, relative_file_path: str, category: CategoryEnum, db: Session):
-        """Add a new document to the database"""
+    def _shutdown_executor(self):
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+    
+    @staticmethod
+    def _inspect_safely(file_path: str, known_hash: Optional[str]):
         try:
-            # Resolve the absolute path for file operations
-            absolute_file_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), relative_file_path[2:])
-            
-            # Get file size
-            file_size = os.path.getsize(absolute_file_path)
-            
-            # Extract PDF metadata
-            metadata = self.pdf_processor.extract_metadata(absolute_file_path)
-            page_count = metadata.get("page_count", 0)
-            
-            # Create unique filename for database
-            unique_filename = f"{uuid.uuid4()}_{filename}"
-            
-            # Create document record
-            document = Document(
-                filename=unique_filename,
-                original_name=filename,
-                category=category,
-                file_path=relative_file_path,
-                file_size=file_size,
-                page_count=page_count,
-                description=f"Auto-imported {category.value} document",
-                tags="",
-                classification_level="",
-                created_by="System"
-            )
-            
-            db.add(document)
-            db.commit()
-            db.refresh(document)
-            
+            return _inspect_file(file_path, known_hash)
         except Exception as e:
-            db.rollback()
-            raise e
+            return e
     
-    def _update_document_metadata(self, document: Document, relative_file_path: str, db: Session):
-        """Update document metadata if file has changed"""
+    def _commit_batch(self, documents: List[Document], db: Session):
         try:
-            # Resolve the absolute path for file operations
-            absolute_file_path = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), relative_file_path[2:])
-            
-            # Get updated file size
-            file_size = os.path.getsize(absolute_file_path)
-            
-            # Extract updated PDF metadata
-            metadata = self.pdf_processor.extract_metadata(absolute_file_path)
-            page_count = metadata.get("page_count", 0)
-            
-            # Update document
-            document.file_size = file_size
-            document.page_count = page_count
-            document.upload_date = datetime.utcnow()
-            
             db.commit()
-            
-        except Exception as e:
+        except Exception:
             db.rollback()
-            raise e
+            raise
+        document_cache = get_document_cache()
+        for document in documents:
+            document_cache.invalidate(document.id)
+        get_processing_queue().enqueue_many(documents, db)
+    
+    def _record_manifest(self, manifest_entry: Optional[FileManifest], relative_file_path: str,
+                         category: CategoryEnum, stat: os.stat_result, content_hash: Optional[str],
+                         document_id: int, db: Session):
+        if manifest_entry is None:
+            manifest_entry = FileManifest(path=relative_file_path, category=category)
+            db.add(manifest_entry)
+        manifest_entry.size = stat.st_size
+        manifest_entry.mtime_ns = stat.st_mtime_ns
+        manifest_entry.inode = stat.st_ino
+        manifest_entry.content_hash = content_hash
+        manifest_entry.document_id = document_id
+    
+    def _add_document_to_db(self, filename: str, relative_file_path: str, category: CategoryEnum,
+                            file_size: int, info: dict, db: Session) -> Document:
+        """Add a new document to the session; the caller commits"""
+        # Create unique filename for database
+        unique_filename = f"{uuid.uuid4()}_{filename}"
+        
+        # Create document record
+        document = Document(
+            filename=unique_filename,
+            original_name=filename,
+            category=category,
+            file_path=relative_file_path,
+            file_size=file_size,
+            content_hash=info["content_hash"],
+            page_count=info.get("page_count", 0),
+            description=f"Auto-imported {category.value} document",
+            tags="",
+            classification_level="",
+            created_by="System"
+        )
+        
+        db.add(document)
+        return document
+    
+    def _update_document_metadata(self, document: Document, file_size: int, info: dict, db: Session):
+        """Update document metadata if file has changed; the caller commits"""
+        # Renderings of the previous version are no longer reachable
+        if document.content_hash and document.content_hash != info["content_hash"]:
+            get_page_cache().invalidate(document.content_hash)
+        
+        # Update document
+        document.file_size = file_size
+        document.content_hash = info["content_hash"]
+        document.page_count = info["page_count"]
+        document.upload_date = datetime.utcnow()
     
     def get_document_count_by_category(self, category: str) -> int:
         """Get the number of documents in a category"""
@@ -0,0 +1,175 @@
+import os
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+from app.database.connection import SessionLocal
+from app.services.directory_scanner import DirectoryScanner
+from app.services.scan_scheduler import get_scan_scheduler
+from config import settings
+
+try:
+    # watchdog uses inotify on Linux; without it we fall back to polling
+    from watchdog.observers import Observer
+    from watchdog.events import FileSystemEventHandler
+except ImportError:
+    Observer = None
+    FileSystemEventHandler = object
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher: "DirectoryWatcher"):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if event.is_directory:
+            return
+        self.watcher.record_path(event.src_path)
+        dest_path = getattr(event, "dest_path", None)
+        if dest_path:
+            self.watcher.record_path(dest_path)
+
+class DirectoryWatcher:
+    """Watches the category directories and applies per-file updates.
+
+    Events are debounced per file: a file is synced once it has been quiet for
+    ``debounce`` seconds, so a large copy only triggers one update. Syncs take
+    the scan scheduler's lock so they never overlap a full scan.
+    """
+
+    def __init__(self, mode: str = None, debounce: float = None, poll_interval: float = None):
+        self.requested_mode = mode or settings.WATCH_MODE
+        self.debounce = settings.WATCH_DEBOUNCE_SECONDS if debounce is None else debounce
+        self.poll_interval = poll_interval or settings.WATCH_POLL_INTERVAL
+        self.scanner = DirectoryScanner()
+        self.mode: Optional[str] = None
+        self._directories = {
+            os.path.abspath(os.path.join(settings.UPLOAD_DIRECTORY, category)): category
+            for category in self.scanner.categories
+        }
+        self._lock = threading.Lock()
+        self._pending: Dict[Tuple[str, str], float] = {}
+        self._stopping = threading.Event()
+        self._threads = []
+        self._observer = None
+
+    def start(self):
+        if self.mode is not None:
+            return
+
+        for directory in self._directories:
+            os.makedirs(directory, exist_ok=True)
+
+        if self.requested_mode == "inotify" and Observer is None:
+            raise RuntimeError("WATCH_MODE=inotify requires the watchdog package")
+
+        self._stopping.clear()
+        if self.requested_mode in ("auto", "inotify") and Observer is not None:
+            self._observer = Observer()
+            handler = _EventHandler(self)
+            for directory in self._directories:
+                self._observer.schedule(handler, directory, recursive=False)
+            self._observer.start()
+            self.mode = "inotify"
+        else:
+            self._start_thread(self._poll_loop, "directory-watch-poll")
+            self.mode = "poll"
+
+        self._start_thread(self._flush_loop, "directory-watch-flush")
+        print(f"Watching upload directories ({self.mode})")
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        if self._observer is not None:
+            self._observer.stop()
+            self._observer.join(timeout)
+            self._observer = None
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+        self.mode = None
+
+    def _start_thread(self, target, name: str):
+        thread = threading.Thread(target=target, name=name, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def record_path(self, path: str):
+        directory, filename = os.path.split(os.path.abspath(path))
+        category = self._directories.get(directory)
+        if category is None or not filename.lower().endswith('.pdf'):
+            return
+        with self._lock:
+            self._pending[(category, filename)] = time.monotonic()
+
+    def _snapshot(self) -> Dict[Tuple[str, str], tuple]:
+        snapshot = {}
+        for directory, category in self._directories.items():
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if entry.name.lower().endswith('.pdf') and entry.is_file():
+                            stat = entry.stat()
+                            snapshot[(category, entry.name)] = (stat.st_size, stat.st_mtime_ns, stat.st_ino)
+            except FileNotFoundError:
+                continue
+        return snapshot
+
+    def _poll_loop(self):
+        previous = self._snapshot()
+        while not self._stopping.wait(self.poll_interval):
+            current = self._snapshot()
+            changed = {key for key in current.keys() | previous.keys() if current.get(key) != previous.get(key)}
+            if changed:
+                now = time.monotonic()
+                with self._lock:
+                    for key in changed:
+                        self._pending[key] = now
+            previous = current
+
+    def _flush_loop(self):
+        while not self._stopping.wait(max(0.1, self.debounce / 2)):
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"Directory watch error: {e}")
+
+    def flush(self, force: bool = False) -> Dict[str, list]:
+        """Sync files whose last event is older than the debounce window"""
+        cutoff = time.monotonic() - self.debounce
+        by_category: Dict[str, list] = {}
+        with self._lock:
+            for key, seen in list(self._pending.items()):
+                if force or seen <= cutoff:
+                    del self._pending[key]
+                    by_category.setdefault(key[0], []).append(key[1])
+
+        results = {'added': [], 'updated': [], 'removed': [], 'errors': []}
+        if not by_category:
+            return results
+
+        with get_scan_scheduler().exclusive():
+            db = SessionLocal()
+            try:
+                for category, filenames in by_category.items():
+                    category_results = self.scanner.sync_files(category, filenames, db)
+                    for key in results:
+                        results[key].extend(category_results.get(key, []))
+            finally:
+                db.close()
+
+        if any(results.values()):
+            print(f"Directory watch: added={len(results['added'])} updated={len(results['updated'])} "
+                  f"removed={len(results['removed'])} errors={len(results['errors'])}")
+        return results
+
+_directory_watcher = None
+_directory_watcher_lock = threading.Lock()
+
+def get_directory_watcher() -> DirectoryWatcher:
+    """Process-wide directory watcher, created on first use"""
+    global _directory_watcher
+    if _directory_watcher is None:
+        with _directory_watcher_lock:
+            if _directory_watcher is None:
+                _directory_watcher = DirectoryWatcher()
+    return _directory_watcher
@@ -0,0 +1,131 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+from app.models.document import Document
+from app.utils.paths import resolve_file_path
+from config import settings
+
+class DocumentRecord:
+    """Read-only snapshot of an active document and its file, shared between requests"""
+
+    __slots__ = ("id", "original_name", "file_path", "resolved_path", "file_size", "mtime_ns",
+                 "page_count", "content_hash", "data")
+
+    def __init__(self, document: Document, stat: Optional[os.stat_result]):
+        self.id = document.id
+        self.original_name = document.original_name
+        self.file_path = document.file_path
+        self.resolved_path = resolve_file_path(document.file_path)
+        self.file_size = stat.st_size if stat else None
+        self.mtime_ns = stat.st_mtime_ns if stat else None
+        self.page_count = document.page_count
+        self.content_hash = document.content_hash
+        self.data = document.to_dict()
+
+    @property
+    def on_disk(self) -> bool:
+        return self.mtime_ns is not None
+
+class DocumentCache:
+    """Bounded LRU of active document records with a TTL.
+
+    Saves the per-request database lookup on routes that only need a
+    document's path, size, page count and hash. A hit is checked against the
+    file's size and mtime, so a file changed on disk is never served from a
+    stale record; database changes must call ``invalidate``.
+    """
+
+    def __init__(self, max_entries: int = None, ttl: float = None):
+        self.max_entries = settings.DOCUMENT_CACHE_SIZE if max_entries is None else max_entries
+        self.ttl = settings.DOCUMENT_CACHE_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # id -> (expires_at, record), least recently used first
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def generation(self) -> int:
+        """Token to take before a database read and pass to ``put``"""
+        with self._lock:
+            return self._generation
+
+    def get(self, document_id: int) -> Optional[DocumentRecord]:
+        with self._lock:
+            entry = self._entries.get(document_id)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[document_id]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(document_id)
+
+        record = entry[1]
+        try:
+            stat = os.stat(record.resolved_path)
+        except OSError:
+            stat = None
+        if stat is None or stat.st_size != record.file_size or stat.st_mtime_ns != record.mtime_ns:
+            self.invalidate(document_id)
+            with self._lock:
+                self.misses += 1
+            return None
+
+        with self._lock:
+            self.hits += 1
+        return record
+
+    def put(self, document: Document, generation: Optional[int] = None) -> DocumentRecord:
+        """Snapshot a document loaded from the database, caching it if its file is on disk.
+
+        The record is not cached when anything was invalidated since ``generation``
+        was taken, since the row may predate that change.
+        """
+        try:
+            stat = os.stat(resolve_file_path(document.file_path))
+        except OSError:
+            stat = None
+        record = DocumentRecord(document, stat)
+
+        if self.max_entries <= 0 or not record.on_disk:
+            return record
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return record
+            self._entries[record.id] = (time.monotonic() + self.ttl, record)
+            self._entries.move_to_end(record.id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return record
+
+    def invalidate(self, document_id: int):
+        with self._lock:
+            self._generation += 1
+            self.invalidations += 1
+            self._entries.pop(document_id, None)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations
+            }
+
+_document_cache = None
+_document_cache_lock = threading.Lock()
+
+def get_document_cache() -> DocumentCache:
+    """Process-wide document cache, created on first use"""
+    global _document_cache
+    if _document_cache is None:
+        with _document_cache_lock:
+            if _document_cache is None:
+                _document_cache = DocumentCache()
+    return _document_cache
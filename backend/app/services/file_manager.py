@@ -1,8 +1,28 @@
 import os
 import shutil
+import hashlib
+import uuid
+from typing import BinaryIO
 from fastapi import UploadFile
+from app.utils.validators import FileValidator
 from config import settings
 
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+PDF_HEADER = b"%PDF-"
+
+class InvalidUploadError(ValueError):
+    """Upload rejected while it was being received"""
+
+def compute_file_hash(file_path: str) -> str:
+    try:
+        sha256 = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b""):
+                sha256.update(chunk)
+        return sha256.hexdigest()
+    except Exception as e:
+        raise Exception(f"Failed to hash file: {str(e)}")
+
 class FileManager:
     def __init__(self):
         self.upload_directory = settings.UPLOAD_DIRECTORY
@@ -27,6 +47,89 @@ class FileManager:
         except Exception as e:
             raise Exception(f"Failed to save file: {str(e)}")
     
+    def receive_upload(self, source: BinaryIO, category: str) -> dict:
+        """Stream an upload into a hidden temp file in the category directory.
+
+        The SHA-256, the ``%PDF-`` header, the detected type and the size cap are
+        checked chunk by chunk, so a bad upload is rejected without reading it twice.
+        Returns ``temp_path``, ``file_size`` and ``content_hash``; pass it to
+        ``commit_upload`` or ``delete_file``.
+        """
+        if category not in settings.CATEGORIES:
+            raise ValueError(f"Invalid category: {category}")
+        
+        temp_path = os.path.join(self.upload_directory, category, f".upload-{uuid.uuid4()}.part")
+        sha256 = hashlib.sha256()
+        file_size = 0
+        
+        try:
+            with open(temp_path, "wb") as buffer:
+                for chunk in iter(lambda: source.read(UPLOAD_CHUNK_SIZE), b""):
+                    if file_size == 0:
+                        self.validate_pdf_start(chunk)
+                    file_size += len(chunk)
+                    if file_size > settings.UPLOAD_MAX_SIZE:
+                        raise InvalidUploadError("File size exceeds maximum limit")
+                    sha256.update(chunk)
+                    buffer.write(chunk)
+            
+            if file_size == 0:
+                raise InvalidUploadError("File is empty")
+        except InvalidUploadError:
+            self.delete_file(temp_path)
+            raise
+        except Exception as e:
+            self.delete_file(temp_path)
+            raise Exception(f"Failed to save file: {str(e)}")
+        
+        return {"temp_path": temp_path, "file_size": file_size, "content_hash": sha256.hexdigest()}
+    
+    def validate_pdf_start(self, data: bytes):
+        """Check the first bytes of an upload for a PDF header and type"""
+        if not data.startswith(PDF_HEADER) or not FileValidator().validate_file_type(data):
+            raise InvalidUploadError("File is not a PDF document")
+    
+    def create_session_file(self, category: str, upload_id: str) -> str:
+        """Empty temp file that the chunks of a resumable upload are written into"""
+        if category not in settings.CATEGORIES:
+            raise ValueError(f"Invalid category: {category}")
+        
+        temp_path = os.path.join(self.upload_directory, category, f".upload-{upload_id}.part")
+        open(temp_path, "wb").close()
+        return temp_path
+    
+    def write_chunk(self, temp_path: str, offset: int, data: bytes) -> int:
+        """Write a chunk of a resumable upload at ``offset``; returns the new size.
+
+        The header is checked by the chunk that completes it, however the first
+        bytes were split across requests.
+        """
+        if offset < len(PDF_HEADER) <= offset + len(data):
+            with open(temp_path, "rb") as f:
+                head = f.read(offset)
+            self.validate_pdf_start(head + data)
+        with open(temp_path, "r+b") as buffer:
+            buffer.seek(offset)
+            buffer.write(data)
+            buffer.truncate()
+        return offset + len(data)
+    
+    def check_received(self, temp_path: str) -> dict:
+        """Validate and hash a fully received resumable upload, in the shape of ``receive_upload``"""
+        with open(temp_path, "rb") as f:
+            self.validate_pdf_start(f.read(UPLOAD_CHUNK_SIZE))
+        return {
+            "temp_path": temp_path,
+            "file_size": os.path.getsize(temp_path),
+            "content_hash": compute_file_hash(temp_path)
+        }
+    
+    def commit_upload(self, temp_path: str, category: str, filename: str) -> str:
+        """Atomically move a received upload to its final name"""
+        file_path = os.path.join(self.upload_directory, category, filename)
+        os.replace(temp_path, file_path)
+        return file_path
+    
     def delete_file(self, file_path: str) -> bool:
         try:
             if os.path.exists(file_path):
@@ -36,6 +139,9 @@ class FileManager:
         except Exception as e:
             raise Exception(f"Failed to delete file: {str(e)}")
     
+    def get_file_hash(self, file_path: str) -> str:
+        return compute_file_hash(file_path)
+    
     def get_file_size(self, file_path: str) -> int:
         try:
             return os.path.getsize(file_path)
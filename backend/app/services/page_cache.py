@@ -0,0 +1,133 @@
+import os
+import shutil
+import threading
+from collections import OrderedDict
+from typing import Optional, Union
+from config import settings
+
+class PageCache:
+    """Content-addressed on-disk cache of rendered pages with LRU eviction.
+
+    Entries live at ``<directory>/<hash[:2]>/<hash>/<page>_<variant>.<format>``
+    so everything rendered from one version of a file can be dropped at once.
+    The variant is the DPI for whole pages, or any other key that identifies
+    a rendering of the page (e.g. a tile).
+    """
+
+    def __init__(self, directory: str = None, max_bytes: int = None):
+        self.directory = directory or settings.PAGE_CACHE_DIRECTORY
+        self.max_bytes = settings.PAGE_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()  # path -> size, least recently used first
+        self._total_bytes = 0
+        self._load_existing_entries()
+
+    def _load_existing_entries(self):
+        os.makedirs(self.directory, exist_ok=True)
+        found = []
+        for dirpath, dirnames, filenames in os.walk(self.directory):
+            for filename in filenames:
+                path = os.path.join(dirpath, filename)
+                if filename.endswith(".tmp"):
+                    # Left behind by an interrupted write
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                    continue
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                found.append((stat.st_mtime, path, stat.st_size))
+
+        for _, path, size in sorted(found):
+            self._entries[path] = size
+            self._total_bytes += size
+
+    def _entry_dir(self, content_hash: str) -> str:
+        return os.path.join(self.directory, content_hash[:2], content_hash)
+
+    def entry_path(self, content_hash: str, page: int, variant: Union[int, str], image_format: str) -> str:
+        return os.path.join(self._entry_dir(content_hash), f"{page}_{variant}.{image_format}")
+
+    @staticmethod
+    def etag(content_hash: str, page: int, variant: Union[int, str], image_format: str) -> str:
+        return f'"{content_hash[:32]}-{page}-{variant}-{image_format}"'
+
+    def get(self, content_hash: str, page: int, variant: Union[int, str], image_format: str) -> Optional[str]:
+        """Return the cached file path on a hit, marking it most recently used"""
+        path = self.entry_path(content_hash, page, variant, image_format)
+        with self._lock:
+            if path not in self._entries:
+                return None
+            if not os.path.exists(path):
+                self._total_bytes -= self._entries.pop(path)
+                return None
+            self._entries.move_to_end(path)
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return path
+
+    def put(self, content_hash: str, page: int, variant: Union[int, str], image_format: str, data: bytes) -> str:
+        path = self.entry_path(content_hash, page, variant, image_format)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Write to a temp file and rename so readers never see a partial image
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as buffer:
+            buffer.write(data)
+        os.replace(temp_path, path)
+
+        with self._lock:
+            if path in self._entries:
+                self._total_bytes -= self._entries.pop(path)
+            self._entries[path] = len(data)
+            self._total_bytes += len(data)
+            self._evict()
+
+        return path
+
+    def _evict(self):
+        while self._total_bytes > self.max_bytes and self._entries:
+            path, size = self._entries.popitem(last=False)
+            self._total_bytes -= size
+            try:
+                os.remove(path)
+            except OSError:
+                pass
+
+    def invalidate(self, content_hash: str):
+        """Drop every cached rendering of one file version"""
+        if not content_hash:
+            return
+
+        entry_dir = self._entry_dir(content_hash)
+        with self._lock:
+            prefix = entry_dir + os.sep
+            for path in [p for p in self._entries if p.startswith(prefix)]:
+                self._total_bytes -= self._entries.pop(path)
+        shutil.rmtree(entry_dir, ignore_errors=True)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._total_bytes,
+                "max_bytes": self.max_bytes
+            }
+
+_page_cache = None
+_page_cache_lock = threading.Lock()
+
+def get_page_cache() -> PageCache:
+    """Process-wide page cache, created on first use"""
+    global _page_cache
+    if _page_cache is None:
+        with _page_cache_lock:
+            if _page_cache is None:
+                _page_cache = PageCache()
+    return _page_cache
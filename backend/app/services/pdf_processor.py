@@ -1,27 +1,155 @@
 import fitz
 from PIL import Image
+import functools
 import io
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
 from typing import Optional
+from config import settings
+
+# PyMuPDF is not thread-safe, even across separate documents: every MuPDF call in
+# a process holds this lock. Parallel rendering comes from the process render pool.
+mupdf_lock = threading.RLock()
+
+def serialized(method):
+    """Run a method holding ``mupdf_lock``, covering pixmaps used after their document is returned"""
+    @functools.wraps(method)
+    def wrapper(*args, **kwargs):
+        with mupdf_lock:
+            return method(*args, **kwargs)
+    return wrapper
+
+class _PooledDocument:
+    def __init__(self, key: tuple):
+        self.key = key
+        self.doc = None
+        self.in_use = False
+        self.last_used = time.monotonic()
+        self.retired = False
+
+    def close(self):
+        if self.doc is not None:
+            self.doc.close()
+            self.doc = None
+
+class DocumentPool:
+    """Process-wide pool of open fitz documents keyed by path and (mtime, size).
+
+    A fitz.Document must not be used from two threads at once, so each
+    ``with pool.open(...)`` checks out a handle of its own: an idle one for the
+    file if there is one, otherwise a new one. ``mupdf_lock`` is held while a
+    handle is out, so within a process documents are used one at a time; render
+    pool processes each have their own pool. Handles that are evicted while
+    checked out are closed when they are returned.
+    """
+
+    def __init__(self, max_size: int = None, idle_timeout: float = None):
+        self.max_size = max_size or settings.PDF_HANDLE_POOL_SIZE
+        self.idle_timeout = settings.PDF_HANDLE_IDLE_SECONDS if idle_timeout is None else idle_timeout
+        self._lock = threading.Lock()
+        self._handles = OrderedDict()  # path -> [_PooledDocument], least recently used path first
+
+    @contextmanager
+    def open(self, file_path: str):
+        path = os.path.abspath(file_path)
+        stat = os.stat(path)
+        key = (stat.st_mtime_ns, stat.st_size)
+
+        with mupdf_lock:
+            with self._lock:
+                entries = self._handles.setdefault(path, [])
+                for stale in [e for e in entries if e.key != key]:
+                    # File changed on disk since it was opened
+                    entries.remove(stale)
+                    self._retire(stale)
+                entry = next((e for e in entries if not e.in_use), None)
+                if entry is None:
+                    entry = _PooledDocument(key)
+                    entries.append(entry)
+                entry.in_use = True
+                self._handles.move_to_end(path)
+                self._evict()
+
+            try:
+                if entry.doc is None:
+                    entry.doc = fitz.open(path)
+                yield entry.doc
+            finally:
+                with self._lock:
+                    entry.in_use = False
+                    entry.last_used = time.monotonic()
+                    if entry.retired:
+                        entry.close()
+
+    def _evict(self):
+        now = time.monotonic()
+        for path, entries in list(self._handles.items()):
+            for entry in [e for e in entries if not e.in_use and now - e.last_used > self.idle_timeout]:
+                entries.remove(entry)
+                self._retire(entry)
+            if not entries:
+                del self._handles[path]
+
+        count = sum(len(entries) for entries in self._handles.values())
+        for path, entries in list(self._handles.items()):
+            if count <= self.max_size:
+                break
+            # Handles in use stay until they are returned; the pool may briefly run over
+            for entry in [e for e in entries if not e.in_use]:
+                entries.remove(entry)
+                self._retire(entry)
+                count -= 1
+            if not entries:
+                del self._handles[path]
+
+    def _retire(self, entry: _PooledDocument):
+        entry.retired = True
+        if not entry.in_use:
+            entry.close()
+
+    def close_idle(self):
+        with mupdf_lock, self._lock:
+            self._evict()
+
+    def close_all(self):
+        with mupdf_lock, self._lock:
+            while self._handles:
+                _, entries = self._handles.popitem()
+                for entry in entries:
+                    self._retire(entry)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "open": sum(1 for entries in self._handles.values() for entry in entries if entry.doc is not None),
+                "in_use": sum(1 for entries in self._handles.values() for entry in entries if entry.in_use),
+                "max_size": self.max_size
+            }
+
+document_pool = DocumentPool()
 
 class PDFProcessor:
     def __init__(self):
-        pass
+        self.document_pool = document_pool
     
+    @serialized
     def get_page_count(self, file_path: str) -> int:
         try:
-            doc = fitz.open(file_path)
-            page_count = len(doc)
-            doc.close()
-            return page_count
+            with self.document_pool.open(file_path) as doc:
+                return len(doc)
         except Exception as e:
             raise Exception(f"Error reading PDF: {str(e)}")
     
+    @serialized
     def extract_metadata(self, file_path: str) -> dict:
         try:
-            doc = fitz.open(file_path)
-            metadata = doc.metadata
-            page_count = len(doc)
-            doc.close()
+            with self.document_pool.open(file_path) as doc:
+                metadata = doc.metadata
+                page_count = len(doc)
             
             return {
                 "page_count": page_count,
@@ -36,55 +164,255 @@ class PDFProcessor:
         except Exception as e:
             raise Exception(f"Error extracting metadata: {str(e)}")
     
-    def generate_page_image(self, file_path: str, page_num: int = 0, dpi: int = 150) -> io.BytesIO:
+    @serialized
+    def generate_page_image(self, file_path: str, page_num: int = 0, dpi: int = 150, width: Optional[int] = None,
+                            grayscale: bool = False, image_format: str = "png", quality: int = 80) -> io.BytesIO:
+        """Render a page at ``dpi``, or scaled to ``width`` pixels (within the preview DPI bounds)"""
         try:
-            doc = fitz.open(file_path)
-            if page_num >= len(doc):
-                raise Exception(f"Page {page_num + 1} does not exist")
-            
-            page = doc.load_page(page_num)
-            mat = fitz.Matrix(dpi / 72, dpi / 72)
-            pix = page.get_pixmap(matrix=mat)
+            with self.document_pool.open(file_path) as doc:
+                pix = self._render_page(doc, page_num, dpi, width, grayscale)
             
-            img_data = pix.tobytes("png")
-            doc.close()
+            img_data = self.encode_pixmap(pix, image_format, quality)
             
             return io.BytesIO(img_data)
+        except ValueError:
+            raise
         except Exception as e:
             raise Exception(f"Error generating page image: {str(e)}")
     
-    def extract_text_from_page(self, file_path: str, page_num: int = 0) -> str:
+    @serialized
+    def generate_page_images(self, file_path: str, page_nums: list, dpi: int = 150, width: Optional[int] = None,
+                             grayscale: bool = False, image_format: str = "png", quality: int = 80) -> list:
+        """Render several pages of one document with a single handle; returns encoded images in order"""
         try:
-            doc = fitz.open(file_path)
-            if page_num >= len(doc):
-                raise Exception(f"Page {page_num + 1} does not exist")
+            images = []
+            with self.document_pool.open(file_path) as doc:
+                for page_num in page_nums:
+                    pix = self._render_page(doc, page_num, dpi, width, grayscale)
+                    images.append(self.encode_pixmap(pix, image_format, quality))
+            return images
+        except Exception as e:
+            raise Exception(f"Error generating page images: {str(e)}")
+    
+    @staticmethod
+    def _render_page(doc, page_num: int, dpi: float, width: Optional[int], grayscale: bool):
+        if not 0 <= page_num < len(doc):
+            raise ValueError(f"Page {page_num + 1} does not exist")
+        
+        page = doc.load_page(page_num)
+        if width:
+            dpi = width * 72 / page.rect.width
+            dpi = min(max(dpi, settings.PREVIEW_MIN_DPI), settings.PREVIEW_MAX_DPI)
+        mat = fitz.Matrix(dpi / 72, dpi / 72)
+        # Rendering straight to gray is cheaper than converting afterwards
+        colorspace = fitz.csGRAY if grayscale else fitz.csRGB
+        return page.get_pixmap(matrix=mat, colorspace=colorspace)
+    
+    @staticmethod
+    def encode_pixmap(pix, image_format: str = "png", quality: int = 80) -> bytes:
+        if image_format == "png":
+            return pix.tobytes("png")
+        if image_format == "jpeg":
+            return pix.tobytes("jpeg", jpg_quality=quality)
+        if image_format == "webp":
+            # MuPDF has no WebP writer; hand the raw samples to Pillow
+            mode = "L" if pix.n == 1 else "RGB"
+            image = Image.frombytes(mode, (pix.width, pix.height), pix.samples)
+            buffer = io.BytesIO()
+            image.save(buffer, "WEBP", quality=quality)
+            return buffer.getvalue()
+        raise ValueError(f"Unsupported image format: {image_format}")
+    
+    @staticmethod
+    def tile_grid(width: float, height: float, zoom: int, tile_size: int) -> dict:
+        """Pixel size and tile counts of a page at a zoom level; level 0 fits the page in one tile"""
+        scale = tile_size / max(width, height) * (2 ** zoom)
+        pixel_width = math.ceil(width * scale)
+        pixel_height = math.ceil(height * scale)
+        return {
+            "zoom": zoom,
+            "scale": scale,
+            "width": pixel_width,
+            "height": pixel_height,
+            "columns": math.ceil(pixel_width / tile_size),
+            "rows": math.ceil(pixel_height / tile_size)
+        }
+    
+    @serialized
+    def get_page_size(self, file_path: str, page_num: int = 0) -> tuple:
+        """Page width and height in points"""
+        with self.document_pool.open(file_path) as doc:
+            if not 0 <= page_num < len(doc):
+                raise ValueError(f"Page {page_num + 1} does not exist")
+            rect = doc.load_page(page_num).rect
+            return rect.width, rect.height
+    
+    @serialized
+    def generate_page_tile(self, file_path: str, page_num: int, zoom: int, x: int, y: int, tile_size: int) -> bytes:
+        """Render one tile of a page, rasterizing only the clipped region so memory stays bounded"""
+        try:
+            with self.document_pool.open(file_path) as doc:
+                if not 0 <= page_num < len(doc):
+                    raise ValueError(f"Page {page_num + 1} does not exist")
+                
+                page = doc.load_page(page_num)
+                rect = page.rect
+                grid = self.tile_grid(rect.width, rect.height, zoom, tile_size)
+                if not (0 <= x < grid["columns"] and 0 <= y < grid["rows"]):
+                    raise ValueError(f"Tile {x},{y} does not exist at zoom {zoom}")
+                
+                scale = grid["scale"]
+                clip = fitz.Rect(
+                    rect.x0 + x * tile_size / scale,
+                    rect.y0 + y * tile_size / scale,
+                    rect.x0 + min((x + 1) * tile_size, grid["width"]) / scale,
+                    rect.y0 + min((y + 1) * tile_size, grid["height"]) / scale
+                )
+                pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale), clip=clip)
+            
+            return pix.tobytes("png")
+        except ValueError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error generating tile: {str(e)}")
+    
+    @serialized
+    def generate_thumbnail_sprite(self, file_path: str, thumb_height: int, columns: int, max_pages: int,
+                                  quality: int = 70) -> tuple:
+        """Render the first ``max_pages`` pages at ``thumb_height`` pixels and pack them into one JPEG.
+        
+        Returns the image bytes and an offset map with each page's box in the sprite.
+        """
+        try:
+            pixmaps = []
+            with self.document_pool.open(file_path) as doc:
+                page_count = len(doc)
+                for page_num in range(min(page_count, max_pages)):
+                    page = doc.load_page(page_num)
+                    zoom = thumb_height / page.rect.height
+                    pixmaps.append(page.get_pixmap(matrix=fitz.Matrix(zoom, zoom), colorspace=fitz.csRGB))
+            
+            if not pixmaps:
+                raise ValueError("Document has no pages")
+            
+            cell_width = max(pix.width for pix in pixmaps)
+            cell_height = max(pix.height for pix in pixmaps)
+            columns = min(columns, len(pixmaps))
+            rows = math.ceil(len(pixmaps) / columns)
+            sprite = Image.new("RGB", (cell_width * columns, cell_height * rows), "white")
             
-            page = doc.load_page(page_num)
-            text = page.get_text()
-            doc.close()
+            pages = []
+            for index, pix in enumerate(pixmaps):
+                x = (index % columns) * cell_width
+                y = (index // columns) * cell_height
+                sprite.paste(Image.frombytes("RGB", (pix.width, pix.height), pix.samples), (x, y))
+                pages.append({"page": index + 1, "x": x, "y": y, "width": pix.width, "height": pix.height})
+            
+            buffer = io.BytesIO()
+            sprite.save(buffer, "JPEG", quality=quality, optimize=True)
+            sprite_map = {
+                "width": sprite.width,
+                "height": sprite.height,
+                "thumb_height": thumb_height,
+                "columns": columns,
+                "page_count": page_count,
+                "pages": pages
+            }
+            return buffer.getvalue(), sprite_map
+        except ValueError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error generating thumbnail sprite: {str(e)}")
+    
+    @serialized
+    def extract_text_from_page(self, file_path: str, page_num: int = 0) -> str:
+        try:
+            with self.document_pool.open(file_path) as doc:
+                if page_num >= len(doc):
+                    raise Exception(f"Page {page_num + 1} does not exist")
+                
+                page = doc.load_page(page_num)
+                text = page.get_text()
             
             return text
         except Exception as e:
             raise Exception(f"Error extracting text: {str(e)}")
     
+    @serialized
     def search_text_in_pdf(self, file_path: str, search_term: str) -> list:
         try:
-            doc = fitz.open(file_path)
             results = []
             
-            for page_num in range(len(doc)):
-                page = doc.load_page(page_num)
-                text_instances = page.search_for(search_term)
-                
-                if text_instances:
-                    results.append({
+            with self.document_pool.open(file_path) as doc:
+                for page_num in range(len(doc)):
+                    page = doc.load_page(page_num)
+                    text_instances = page.search_for(search_term)
+                    
+                    if text_instances:
+                        results.append({
+                            "page": page_num + 1,
+                            "matches": len(text_instances),
+                            "positions": [{"x0": inst.x0, "y0": inst.y0, "x1": inst.x1, "y1": inst.y1} 
+                                        for inst in text_instances]
+                        })
+            
+            return results
+        except Exception as e:
+            raise Exception(f"Error searching text: {str(e)}")
+    
+    @serialized
+    def extract_page_index(self, file_path: str, page_nums: Optional[list] = None) -> list:
+        """Text, word boxes and size of every page, or only of the 0-based ``page_nums``"""
+        try:
+            pages = []
+            
+            with self.document_pool.open(file_path) as doc:
+                for page_num in range(len(doc)) if page_nums is None else page_nums:
+                    if not 0 <= page_num < len(doc):
+                        raise ValueError(f"Page {page_num + 1} does not exist")
+                    page = doc.load_page(page_num)
+                    words = [
+                        [round(w[0], 2), round(w[1], 2), round(w[2], 2), round(w[3], 2), w[4], w[5], w[6]]
+                        for w in page.get_text("words")
+                    ]
+                    pages.append({
                         "page": page_num + 1,
-                        "matches": len(text_instances),
-                        "positions": [{"x0": inst.x0, "y0": inst.y0, "x1": inst.x1, "y1": inst.y1} 
-                                    for inst in text_instances]
+                        "width": round(page.rect.width, 2),
+                        "height": round(page.rect.height, 2),
+                        "text": page.get_text(),
+                        "words": words
                     })
             
-            doc.close()
-            return results
+            return pages
+        except ValueError:
+            raise
+        except Exception as e:
+            raise Exception(f"Error indexing PDF: {str(e)}")
+    
+    @serialized
+    def linearize(self, file_path: str) -> bool:
+        """Rewrite the PDF in place as linearized (fast web view); returns False when skipped.
+
+        Linearized files put page 1 first, so a viewer using range requests can
+        show it without fetching the whole file. Skipped for small, encrypted or
+        already linearized files, and when the installed MuPDF no longer supports it.
+        """
+        if os.path.getsize(file_path) < settings.LINEARIZE_MIN_SIZE:
+            return False
+        
+        temp_path = f"{file_path}.linear"
+        try:
+            doc = fitz.open(file_path)
+            try:
+                if doc.is_encrypted or doc.is_fast_webaccess:
+                    return False
+                doc.save(temp_path, linear=True)
+            finally:
+                doc.close()
+            os.replace(temp_path, file_path)
+            return True
         except Exception as e:
-            raise Exception(f"Error searching text: {str(e)}")
\ No newline at end of file
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            print(f"Linearization skipped for {file_path}: {str(e)}")
+            return False
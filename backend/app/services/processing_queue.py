@@ -0,0 +1,305 @@
+import os
+import threading
+import traceback
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy.orm import Session
+
+from app.database.connection import SessionLocal
+from app.models.document import Document
+from app.models.document_page import DocumentPage
+from app.models.processing_job import ProcessingJob, JobStatus
+from app.services.document_cache import get_document_cache
+from app.services.file_manager import FileManager
+from app.services.page_cache import get_page_cache
+from app.services.pdf_processor import PDFProcessor, document_pool
+from app.services.search_index import SearchIndex
+from app.services.thumbnail_sprite import load_sprite_map, store_sprite
+from app.utils.paths import resolve_file_path
+from config import settings
+
+class ProcessingQueue:
+    """Database-backed queue that warms up newly ingested documents.
+
+    Each job extracts page text into the search index, renders a page-1
+    thumbnail, prerenders the first pages into the page cache and packs
+    low-resolution thumbnails of every page into a sprite. Jobs are rows in
+    ``processing_jobs``, so anything left pending or running when the process
+    stops is picked up again on the next start.
+    """
+
+    def __init__(self, worker_count: int = None, poll_interval: float = None):
+        self.worker_count = worker_count or settings.PROCESSING_WORKERS
+        self.poll_interval = poll_interval or settings.PROCESSING_POLL_INTERVAL
+        self.pdf_processor = PDFProcessor()
+        self.search_index = SearchIndex()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def enqueue(self, document: Document, db: Session, upload_id: Optional[str] = None) -> ProcessingJob:
+        """Queue a document for processing, reusing a job that has not started yet"""
+        job = db.query(ProcessingJob).filter(
+            ProcessingJob.document_id == document.id,
+            ProcessingJob.status == JobStatus.pending
+        ).first()
+
+        if job is None:
+            job = ProcessingJob(document_id=document.id, status=JobStatus.pending, progress=0, attempts=0)
+            db.add(job)
+        if upload_id:
+            job.upload_id = upload_id
+        # Queued again (e.g. the file changed), so a job waiting to retry runs now
+        job.retry_at = None
+
+        db.commit()
+        db.refresh(job)
+        self._wakeup.set()
+        return job
+
+    def record_duplicates(self, documents: List[Document], db: Session, upload_id: str, commit: bool = True):
+        """Record uploads that matched already stored documents, so their progress reads as done"""
+        for document in documents:
+            db.add(ProcessingJob(
+                document_id=document.id,
+                upload_id=upload_id,
+                status=JobStatus.completed,
+                stage="duplicate",
+                progress=100,
+                attempts=0
+            ))
+        if commit:
+            db.commit()
+
+    def enqueue_many(self, documents: List[Document], db: Session, upload_id: Optional[str] = None,
+                     commit: bool = True) -> int:
+        """Queue several documents in one transaction, skipping ones already pending.
+
+        With ``commit=False`` the jobs join the caller's transaction, and the
+        caller must ``notify`` the workers once it has committed.
+        """
+        if not documents:
+            return 0
+
+        pending = {
+            document_id for (document_id,) in db.query(ProcessingJob.document_id).filter(
+                ProcessingJob.document_id.in_([document.id for document in documents]),
+                ProcessingJob.status == JobStatus.pending
+            )
+        }
+        queued = 0
+        for document in documents:
+            if document.id not in pending:
+                db.add(ProcessingJob(
+                    document_id=document.id, upload_id=upload_id, status=JobStatus.pending, progress=0, attempts=0
+                ))
+                queued += 1
+
+        if commit:
+            db.commit()
+            self.notify()
+        return queued
+
+    def notify(self):
+        """Wake the workers to look for newly committed jobs"""
+        self._wakeup.set()
+
+    def enqueue_unprocessed(self, db: Session) -> int:
+        """Queue active documents that have neither index pages nor an open job"""
+        has_pages = db.query(DocumentPage.document_id).filter(DocumentPage.document_id == Document.id)
+        has_job = db.query(ProcessingJob.id).filter(
+            ProcessingJob.document_id == Document.id,
+            ProcessingJob.status.in_([JobStatus.pending, JobStatus.running])
+        )
+        documents = db.query(Document).filter(
+            Document.is_active == True,
+            ~has_pages.exists(),
+            ~has_job.exists()
+        ).all()
+
+        for document in documents:
+            db.add(ProcessingJob(document_id=document.id, status=JobStatus.pending, progress=0, attempts=0))
+        db.commit()
+
+        if documents:
+            self._wakeup.set()
+        return len(documents)
+
+    def get_upload_progress(self, upload_id: str, db: Session) -> Optional[dict]:
+        jobs = db.query(ProcessingJob).filter(
+            ProcessingJob.upload_id == upload_id
+        ).order_by(ProcessingJob.id).all()
+
+        if not jobs:
+            return None
+
+        statuses = {job.status for job in jobs}
+        if statuses <= {JobStatus.completed}:
+            status = JobStatus.completed
+        elif statuses <= {JobStatus.completed, JobStatus.failed}:
+            status = JobStatus.failed if statuses == {JobStatus.failed} else "completed_with_errors"
+        elif statuses & {JobStatus.running, JobStatus.completed, JobStatus.failed}:
+            status = "processing"
+        else:
+            status = JobStatus.pending
+
+        return {
+            "upload_id": upload_id,
+            "status": status,
+            "progress": round(sum(job.progress for job in jobs) / len(jobs)),
+            "documents": [job.to_dict() for job in jobs]
+        }
+
+    def start(self):
+        if self._threads:
+            return
+
+        db = SessionLocal()
+        try:
+            # Jobs that were running when the process died start over
+            db.query(ProcessingJob).filter(
+                ProcessingJob.status == JobStatus.running
+            ).update({ProcessingJob.status: JobStatus.pending}, synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+
+        self._stopping.clear()
+        for i in range(self.worker_count):
+            thread = threading.Thread(target=self._worker_loop, name=f"processing-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        self._wakeup.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _worker_loop(self):
+        while not self._stopping.is_set():
+            try:
+                processed = self.process_next()
+            except Exception as e:
+                print(f"Processing queue error: {str(e)}")
+                processed = False
+
+            # Otherwise idle handles are only evicted when another document is opened
+            document_pool.close_idle()
+
+            if not processed:
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def process_next(self) -> bool:
+        """Claim and run one pending job; returns False when the queue is empty"""
+        db = SessionLocal()
+        try:
+            job = self._claim_next(db)
+            if job is None:
+                return False
+            self._run_job(job, db)
+            return True
+        finally:
+            db.close()
+
+    def _claim_next(self, db: Session) -> Optional[ProcessingJob]:
+        candidates = db.query(ProcessingJob.id).filter(
+            ProcessingJob.status == JobStatus.pending,
+            (ProcessingJob.retry_at == None) | (ProcessingJob.retry_at <= datetime.utcnow())
+        ).order_by(ProcessingJob.id).limit(self.worker_count + 1).all()
+
+        for (job_id,) in candidates:
+            # Conditional update so two workers never claim the same job
+            claimed = db.query(ProcessingJob).filter(
+                ProcessingJob.id == job_id,
+                ProcessingJob.status == JobStatus.pending
+            ).update({
+                ProcessingJob.status: JobStatus.running,
+                ProcessingJob.attempts: ProcessingJob.attempts + 1
+            }, synchronize_session=False)
+            db.commit()
+            if claimed:
+                return db.query(ProcessingJob).filter(ProcessingJob.id == job_id).first()
+        return None
+
+    def _run_job(self, job: ProcessingJob, db: Session):
+        try:
+            document = db.query(Document).filter(Document.id == job.document_id).first()
+            if document is None or not document.is_active:
+                self._update(job, db, status=JobStatus.completed, stage="skipped", progress=100)
+                return
+
+            resolved_path = resolve_file_path(document.file_path)
+            if not os.path.exists(resolved_path):
+                raise Exception("File not found on disk")
+
+            if not document.content_hash:
+                document.content_hash = FileManager().get_file_hash(resolved_path)
+                db.commit()
+                get_document_cache().invalidate(document.id)
+
+            renders = self._planned_renders(document)
+            total_steps = 2 + len(renders)
+
+            self._update(job, db, stage="text", progress=0)
+            pages = self.pdf_processor.extract_page_index(resolved_path)
+            self.search_index.index_document(document, resolved_path, db, pages)
+
+            page_cache = get_page_cache()
+            for step, (stage, page, dpi) in enumerate(renders, start=1):
+                self._update(job, db, stage=stage, progress=round(step * 100 / total_steps))
+                if page_cache.get(document.content_hash, page, dpi, "png"):
+                    continue
+                image_data = self.pdf_processor.generate_page_image(resolved_path, page - 1, dpi).getvalue()
+                page_cache.put(document.content_hash, page, dpi, "png", image_data)
+
+            self._update(job, db, stage="sprite", progress=round((total_steps - 1) * 100 / total_steps))
+            if document.page_count and load_sprite_map(document.content_hash) is None:
+                image_data, sprite_map = self.pdf_processor.generate_thumbnail_sprite(
+                    resolved_path, settings.SPRITE_THUMB_HEIGHT, settings.SPRITE_COLUMNS,
+                    settings.SPRITE_MAX_PAGES, settings.SPRITE_QUALITY
+                )
+                store_sprite(document.content_hash, image_data, sprite_map)
+
+            self._update(job, db, status=JobStatus.completed, stage="done", progress=100, error=None, retry_at=None)
+
+        except Exception as e:
+            db.rollback()
+            traceback.print_exc()
+            if job.attempts < settings.PROCESSING_MAX_ATTEMPTS:
+                # Back off before the next attempt: the file may still be being written, or the disk busy
+                delay = settings.PROCESSING_RETRY_DELAY * 2 ** (job.attempts - 1)
+                self._update(job, db, status=JobStatus.pending, error=str(e),
+                             retry_at=datetime.utcnow() + timedelta(seconds=delay))
+            else:
+                self._update(job, db, status=JobStatus.failed, error=str(e), retry_at=None)
+
+    def _planned_renders(self, document: Document) -> list:
+        page_count = document.page_count or 0
+        if page_count == 0:
+            return []
+
+        renders = [("thumbnail", 1, settings.THUMBNAIL_DPI)]
+        for page in range(1, min(page_count, settings.PRERENDER_PAGES) + 1):
+            for dpi in settings.PRERENDER_DPIS:
+                renders.append(("prerender", page, dpi))
+        return renders
+
+    def _update(self, job: ProcessingJob, db: Session, **fields):
+        for name, value in fields.items():
+            setattr(job, name, value)
+        db.commit()
+
+_processing_queue = None
+_processing_queue_lock = threading.Lock()
+
+def get_processing_queue() -> ProcessingQueue:
+    """Process-wide processing queue, created on first use"""
+    global _processing_queue
+    if _processing_queue is None:
+        with _processing_queue_lock:
+            if _processing_queue is None:
+                _processing_queue = ProcessingQueue()
+    return _processing_queue
@@ -0,0 +1,183 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import BrokenExecutor, ThreadPoolExecutor, ProcessPoolExecutor
+from fastapi import HTTPException
+
+from app.services.pdf_processor import PDFProcessor, document_pool
+from config import settings
+
+def _run_job(method: str, args: tuple):
+    # Module level so it can be pickled into a process pool worker
+    return getattr(PDFProcessor(), method)(*args)
+
+def _close_idle_handles():
+    while True:
+        time.sleep(max(settings.PDF_HANDLE_IDLE_SECONDS / 2, 1))
+        document_pool.close_idle()
+
+def _init_worker():
+    # Workers keep their own handle pool; nothing else would close its idle handles
+    threading.Thread(target=_close_idle_handles, name="handle-reaper", daemon=True).start()
+
+class RenderExecutor:
+    """Bounded worker pool for blocking PyMuPDF work, awaited from the event loop.
+
+    PyMuPDF is not thread-safe, so only process mode renders in parallel. In
+    thread mode every MuPDF call holds ``mupdf_lock`` and the workers take turns.
+    """
+
+    def __init__(self, mode: str = None, max_workers: int = None, queue_limit: int = None, job_timeout: float = None):
+        self.mode = mode or settings.RENDER_POOL_MODE
+        self.max_workers = max_workers or settings.RENDER_POOL_WORKERS
+        self.queue_limit = settings.RENDER_QUEUE_LIMIT if queue_limit is None else queue_limit
+        self.job_timeout = job_timeout or settings.RENDER_JOB_TIMEOUT
+
+        if self.mode not in ("process", "thread"):
+            raise ValueError(f"Invalid render pool mode: {self.mode}")
+        self._executor = self._create_executor()
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+
+    def _create_executor(self):
+        if self.mode == "process":
+            # Spawned, not forked: a fork would copy locks held by the parent's threads
+            return ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker
+            )
+        return ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="render")
+
+    def _replace_broken(self, executor):
+        """Start a new pool after a worker process died (e.g. MuPDF crashed on a malformed file)"""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = self._create_executor()
+        print("Render pool worker died; started a new pool")
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def _acquire(self):
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.queue_limit:
+                raise HTTPException(
+                    status_code=503,
+                    detail="Server busy rendering documents, try again shortly",
+                    headers={"Retry-After": str(settings.RENDER_RETRY_AFTER)}
+                )
+            self._in_flight += 1
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    async def run(self, method: str, *args):
+        """Run a PDFProcessor method in the pool, failing fast when the queue is full"""
+        self._acquire()
+        executor = self._executor
+        try:
+            future = executor.submit(_run_job, method, args)
+        except Exception as e:
+            self._release()
+            if isinstance(e, BrokenExecutor):
+                self._replace_broken(executor)
+                raise self._worker_died()
+            raise
+        # Released when the job really finishes, so timed-out jobs still count
+        future.add_done_callback(self._release)
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=self.job_timeout)
+        except BrokenExecutor:
+            self._replace_broken(executor)
+            raise self._worker_died()
+        except asyncio.TimeoutError:
+            future.cancel()
+            raise HTTPException(
+                status_code=503,
+                detail=f"Document processing timed out after {self.job_timeout}s",
+                headers={"Retry-After": str(settings.RENDER_RETRY_AFTER)}
+            )
+
+    @staticmethod
+    def _worker_died() -> HTTPException:
+        return HTTPException(
+            status_code=503,
+            detail="Document processing failed, try again shortly",
+            headers={"Retry-After": str(settings.RENDER_RETRY_AFTER)}
+        )
+
+    async def get_page_count(self, file_path: str) -> int:
+        return await self.run("get_page_count", file_path)
+
+    async def extract_metadata(self, file_path: str) -> dict:
+        return await self.run("extract_metadata", file_path)
+
+    async def generate_page_image(self, file_path: str, page_num: int = 0, dpi: int = 150, width: int = None,
+                                  grayscale: bool = False, image_format: str = "png", quality: int = 80):
+        return await self.run("generate_page_image", file_path, page_num, dpi, width, grayscale, image_format, quality)
+
+    async def generate_page_images(self, file_path: str, page_nums: list, dpi: int = 150, width: int = None,
+                                   grayscale: bool = False, image_format: str = "png", quality: int = 80) -> list:
+        return await self.run("generate_page_images", file_path, page_nums, dpi, width, grayscale, image_format, quality)
+
+    async def get_page_size(self, file_path: str, page_num: int = 0) -> tuple:
+        return await self.run("get_page_size", file_path, page_num)
+
+    async def generate_page_tile(self, file_path: str, page_num: int, zoom: int, x: int, y: int, tile_size: int) -> bytes:
+        return await self.run("generate_page_tile", file_path, page_num, zoom, x, y, tile_size)
+
+    async def generate_thumbnail_sprite(self, file_path: str, thumb_height: int, columns: int, max_pages: int,
+                                        quality: int = 70) -> tuple:
+        return await self.run("generate_thumbnail_sprite", file_path, thumb_height, columns, max_pages, quality)
+
+    async def extract_text_from_page(self, file_path: str, page_num: int = 0) -> str:
+        return await self.run("extract_text_from_page", file_path, page_num)
+
+    async def search_text_in_pdf(self, file_path: str, search_term: str) -> list:
+        return await self.run("search_text_in_pdf", file_path, search_term)
+
+    async def extract_page_index(self, file_path: str, page_nums: list = None) -> list:
+        return await self.run("extract_page_index", file_path, page_nums)
+
+    async def linearize(self, file_path: str) -> bool:
+        return await self.run("linearize", file_path)
+
+    def has_idle_worker(self) -> bool:
+        """True when a job would start right away; used to keep optional work off a busy pool"""
+        with self._lock:
+            return self._in_flight < self.max_workers
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "mode": self.mode,
+                "workers": self.max_workers,
+                "queue_limit": self.queue_limit,
+                "in_flight": self._in_flight
+            }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+_render_executor = None
+_render_executor_lock = threading.Lock()
+
+def get_render_executor() -> RenderExecutor:
+    """Process-wide render executor, created on first use"""
+    global _render_executor
+    if _render_executor is None:
+        with _render_executor_lock:
+            if _render_executor is None:
+                _render_executor = RenderExecutor()
+    return _render_executor
+
+def shutdown_render_executor():
+    global _render_executor
+    with _render_executor_lock:
+        if _render_executor is not None:
+            _render_executor.shutdown()
+            _render_executor = None
@@ -0,0 +1,138 @@
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from app.database.connection import SessionLocal
+from app.services.directory_scanner import DirectoryScanner
+from app.services.processing_queue import get_processing_queue
+from config import settings
+
+class ScanInProgressError(Exception):
+    pass
+
+class ScanScheduler:
+    """Runs directory scans in the background, one at a time, and tracks their progress"""
+
+    def __init__(self, interval: float = None):
+        self.interval = settings.SCAN_INTERVAL_SECONDS if interval is None else interval
+        self._scan_lock = threading.Lock()
+        self._state_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._state = {
+            "status": "idle",
+            "current_category": None,
+            "categories_total": 0,
+            "categories_done": 0,
+            "started_at": None,
+            "finished_at": None,
+            "last_summary": None,
+            "last_error": None,
+            "scans_completed": 0
+        }
+
+    def run_scan(self, categories: Optional[List[str]] = None) -> Dict[str, List[str]]:
+        """Scan now in the calling thread; raises ScanInProgressError if a scan is running"""
+        if not self._scan_lock.acquire(blocking=False):
+            raise ScanInProgressError("A directory scan is already running")
+
+        scanner = DirectoryScanner()
+        categories = categories or scanner.categories
+        results = {
+            'added': [],
+            'updated': [],
+            'errors': []
+        }
+        self._set_state(status="running", current_category=None, categories_total=len(categories),
+                        categories_done=0, started_at=datetime.utcnow().isoformat(), finished_at=None,
+                        last_error=None)
+
+        db = SessionLocal()
+        try:
+            results = scanner.scan_all_directories(
+                db, categories,
+                lambda category, done: self._set_state(current_category=category, categories_done=done)
+            )
+            self._set_state(categories_done=len(categories))
+            get_processing_queue().enqueue_unprocessed(db)
+            return results
+
+        except Exception as e:
+            self._set_state(last_error=str(e))
+            raise
+        finally:
+            db.close()
+            with self._state_lock:
+                self._state.update(
+                    status="idle",
+                    current_category=None,
+                    finished_at=datetime.utcnow().isoformat(),
+                    last_summary={
+                        "added": len(results['added']),
+                        "updated": len(results['updated']),
+                        "errors": len(results['errors'])
+                    }
+                )
+                self._state["scans_completed"] += 1
+            self._scan_lock.release()
+
+    @contextmanager
+    def exclusive(self):
+        """Hold the scan lock for incremental updates, waiting for a running scan to finish"""
+        with self._scan_lock:
+            yield
+
+    def start(self):
+        """Start the initial scan in the background, then rescan every ``interval`` seconds"""
+        if self._thread is not None:
+            return
+        self._stopping.clear()
+        self._thread = threading.Thread(target=self._run_loop, name="directory-scan", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5):
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run_loop(self):
+        while not self._stopping.is_set():
+            started = time.monotonic()
+            try:
+                results = self.run_scan()
+                print(f"Directory scan results: added={len(results['added'])} "
+                      f"updated={len(results['updated'])} errors={len(results['errors'])}")
+            except ScanInProgressError:
+                pass
+            except Exception as e:
+                print(f"Directory scan error: {e}")
+
+            if self.interval <= 0:
+                return
+            self._stopping.wait(max(0, self.interval - (time.monotonic() - started)))
+
+    def _set_state(self, **fields):
+        with self._state_lock:
+            self._state.update(fields)
+
+    def status(self) -> dict:
+        with self._state_lock:
+            state = dict(self._state)
+        state["initial_scan_complete"] = state["scans_completed"] > 0
+        state["interval_seconds"] = self.interval
+        return state
+
+_scan_scheduler = None
+_scan_scheduler_lock = threading.Lock()
+
+def get_scan_scheduler() -> ScanScheduler:
+    """Process-wide scan scheduler, created on first use"""
+    global _scan_scheduler
+    if _scan_scheduler is None:
+        with _scan_scheduler_lock:
+            if _scan_scheduler is None:
+                _scan_scheduler = ScanScheduler()
+    return _scan_scheduler
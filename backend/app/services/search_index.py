@@ -0,0 +1,356 @@
+import html
+import json
+import re
+import zlib
+from typing import Dict, List, Optional
+from sqlalchemy import and_, case, literal, or_, text
+from sqlalchemy.orm import Session
+
+from app.database.connection import is_sqlite
+from app.models.document import Document, CategoryEnum
+from app.models.document_page import DocumentPage
+from app.services.pdf_processor import PDFProcessor
+from app.utils.search_query import QuerySyntaxError, edit_distance, parse_query, query_terms
+from config import settings
+
+# Control characters mark matches in snippets; the text is escaped before they become <mark> tags
+MARK_START = "\x02"
+MARK_END = "\x03"
+
+def _quote(value: str) -> str:
+    return '"' + value.replace('"', '""') + '"'
+
+def _normalize_word(word: str) -> str:
+    return "".join(character for character in word.lower() if character.isalnum())
+
+def _mark(snippet: str) -> str:
+    snippet = " ".join(html.escape(snippet).split())
+    return snippet.replace(MARK_START, "<mark>").replace(MARK_END, "</mark>")
+
+def _plain_snippet(page_text: str, needles: List[str], radius: int = 80) -> str:
+    lowered = page_text.lower()
+    for needle in needles:
+        start = lowered.find(needle)
+        if start != -1:
+            end = start + len(needle)
+            snippet = (
+                html.escape(page_text[max(0, start - radius):start])
+                + "<mark>" + html.escape(page_text[start:end]) + "</mark>"
+                + html.escape(page_text[end:end + radius])
+            )
+            return " ".join(snippet.split())
+    return html.escape(" ".join(page_text[:2 * radius].split()))
+
+class SearchIndex:
+    """Per-page text and word boxes stored in the database for content search"""
+
+    def __init__(self):
+        self.pdf_processor = PDFProcessor()
+
+    def index_document(self, document: Document, file_path: str, db: Session, pages: Optional[list] = None) -> int:
+        """(Re)build the page index for a document and return the number of pages indexed.
+
+        ``pages`` may be passed in when extraction already ran elsewhere (e.g. a worker pool).
+        """
+        try:
+            if pages is None:
+                pages = self.pdf_processor.extract_page_index(file_path)
+
+            db.query(DocumentPage).filter(
+                DocumentPage.document_id == document.id
+            ).delete(synchronize_session=False)
+
+            for page in pages:
+                db.add(DocumentPage(
+                    document_id=document.id,
+                    page_number=page["page"],
+                    width=page.get("width"),
+                    height=page.get("height"),
+                    text=page["text"],
+                    words=self.pack_words(page["words"])
+                ))
+
+            db.commit()
+            return len(pages)
+
+        except Exception as e:
+            db.rollback()
+            raise e
+
+    def search(self, search_term: str, db: Session, category: Optional[CategoryEnum] = None,
+               limit: int = None) -> dict:
+        """Rank documents for a query and return the top ``limit`` with page hits and snippets.
+
+        Only the ``SEARCH_MAX_PAGE_HITS`` best pages are ranked, so the work per
+        query stays bounded however many pages match. Raises QuerySyntaxError
+        for queries that cannot be parsed.
+        """
+        limit = limit or settings.SEARCH_DEFAULT_LIMIT
+        tree = parse_query(search_term, settings.SEARCH_MAX_TERMS)
+        if not any(not negated for negated, _ in query_terms(tree)):
+            raise QuerySyntaxError("Search query needs at least one term that is not excluded")
+
+        documents_query = db.query(Document).filter(Document.is_active == True)
+        if category:
+            documents_query = documents_query.filter(Document.category == category)
+
+        match = self._fts_query(tree, db) if is_sqlite() else None
+        if match:
+            hits = self._ranked_pages(match, db, category)
+        else:
+            hits = self._matching_pages(tree, db, category)
+
+        # Documents score the sum of their best pages, so one strong page beats many weak ones
+        pages_by_document: Dict[int, List[tuple]] = {}
+        for hit in hits:
+            pages_by_document.setdefault(hit[1], []).append(hit)
+        scores = {
+            document_id: sum(hit[3] for hit in pages[:settings.SEARCH_PAGES_PER_DOCUMENT])
+            for document_id, pages in pages_by_document.items()
+        }
+        top = sorted(scores, key=lambda document_id: (-scores[document_id], document_id))[:limit]
+
+        shown = [hit for document_id in top for hit in pages_by_document[document_id][:settings.SEARCH_PAGES_PER_DOCUMENT]]
+        details = self._page_details(tree, match, shown, db)
+        documents = {
+            document.id: document
+            for document in db.query(Document).filter(Document.id.in_(top)).all()
+        } if top else {}
+
+        search_results = []
+        for document_id in top:
+            if document_id not in documents:
+                continue
+            results = []
+            for page_id, _, page_number, score in pages_by_document[document_id][:settings.SEARCH_PAGES_PER_DOCUMENT]:
+                snippet, positions = details.get(page_id, ("", []))
+                results.append({
+                    "page": page_number,
+                    "score": round(score, 6),
+                    "matches": len(positions),
+                    "snippet": snippet,
+                    "positions": positions
+                })
+            search_results.append({
+                "document": documents[document_id].to_dict(),
+                "score": round(scores[document_id], 6),
+                "snippet": results[0]["snippet"] if results else "",
+                "pages_matched": len(pages_by_document[document_id]),
+                "search_results": results,
+                "total_matches": sum(result["matches"] for result in results)
+            })
+
+        return {
+            "search_term": search_term,
+            "documents_searched": documents_query.count(),
+            "documents_with_matches": len(pages_by_document),
+            "truncated": len(hits) >= settings.SEARCH_MAX_PAGE_HITS,
+            "results": search_results,
+            "total_matches": sum(doc["total_matches"] for doc in search_results)
+        }
+
+    def _fts_query(self, node: tuple, db: Session, negated: bool = False) -> str:
+        """Compile a parsed query to an FTS5 MATCH expression, expanding ``term~`` to near spellings.
+
+        Excluded terms are never expanded, so ``-term~`` excludes only ``term``.
+        """
+        kind = node[0]
+        if kind == "phrase":
+            return _quote(node[1])
+        if kind == "term":
+            _, term, prefix, fuzzy = node
+            if prefix:
+                return _quote(term) + " *"
+            variants = [term]
+            if fuzzy and not negated:
+                variants += [variant for variant in self._fuzzy_terms(term, db) if variant != term]
+            if len(variants) == 1:
+                return _quote(term)
+            return "(" + " OR ".join(_quote(variant) for variant in variants) + ")"
+        if kind == "or":
+            return "(" + " OR ".join(self._fts_query(child, db, negated) for child in node[1]) + ")"
+
+        children = node[1] if kind == "and" else [node]
+        included = [self._fts_query(child, db, negated) for child in children if child[0] != "not"]
+        excluded = [self._fts_query(child[1], db, True) for child in children if child[0] == "not"]
+        if not included:
+            # FTS5's NOT is binary; "-a" on its own has nothing to subtract from
+            raise QuerySyntaxError("Excluded terms need a term to exclude them from")
+        expression = "(" + " AND ".join(included) + ")"
+        for term in excluded:
+            expression += f" NOT {term}"
+        return expression
+
+    def _fuzzy_terms(self, term: str, db: Session) -> List[str]:
+        """Indexed terms within a small edit distance of ``term``, most common first.
+
+        Indexed terms are stems, so a term is also compared cut to the stem's
+        length ("intelligense" meets "intellig"). The vocabulary scan is limited
+        to terms sharing the first letter and to ``SEARCH_FUZZY_SCAN_LIMIT`` rows.
+        """
+        max_edits = 1 if len(term) <= 6 else 2
+        rows = db.execute(text("""
+            SELECT term, doc FROM document_pages_search_vocab
+            WHERE term >= :low AND term < :high
+            LIMIT :scan_limit
+        """), {"low": term[0], "high": chr(ord(term[0]) + 1), "scan_limit": settings.SEARCH_FUZZY_SCAN_LIMIT}).all()
+
+        candidates = []
+        for candidate, document_count in rows:
+            if len(candidate) < 3 or len(candidate) > len(term) + max_edits:
+                continue
+            distance = edit_distance(term, candidate, max_edits)
+            if len(term) - 5 <= len(candidate) < len(term):
+                # A cut term may be one edit off a stem, or must match short stems exactly
+                cut_limit = 1 if len(candidate) >= 5 else 0
+                cut_distance = edit_distance(term[:len(candidate)], candidate, cut_limit)
+                if cut_distance <= cut_limit:
+                    distance = min(distance, cut_distance)
+            if distance <= max_edits:
+                candidates.append((distance, -document_count, candidate))
+        return [candidate for _, _, candidate in sorted(candidates)[:settings.SEARCH_FUZZY_MAX_EXPANSIONS]]
+
+    def _ranked_pages(self, match: str, db: Session, category: Optional[CategoryEnum]) -> List[tuple]:
+        """Best pages by BM25 as (page_id, document_id, page_number, score), score higher is better"""
+        sql = """
+            SELECT p.id, p.document_id, p.page_number, -bm25(document_pages_search) AS score
+            FROM document_pages_search
+            JOIN document_pages p ON p.id = document_pages_search.rowid
+            JOIN documents d ON d.id = p.document_id
+            WHERE document_pages_search MATCH :match AND d.is_active = 1
+        """
+        params = {"match": match, "max_hits": settings.SEARCH_MAX_PAGE_HITS}
+        if category:
+            sql += " AND d.category = :category"
+            params["category"] = category.name
+        sql += " ORDER BY score DESC, p.id LIMIT :max_hits"
+        return [tuple(row) for row in db.execute(text(sql), params).all()]
+
+    def _matching_pages(self, node: tuple, db: Session, category: Optional[CategoryEnum]) -> List[tuple]:
+        """Fallback without FTS5: substring matching, pages ranked by how many query terms they contain"""
+        leaves = [leaf for negated, leaf in query_terms(node) if not negated]
+        score = sum(
+            (case((DocumentPage.text.ilike(f"%{leaf[1]}%"), 1), else_=0) for leaf in leaves),
+            literal(0)
+        )
+        query = db.query(
+            DocumentPage.id, DocumentPage.document_id, DocumentPage.page_number, score
+        ).join(Document, Document.id == DocumentPage.document_id).filter(
+            Document.is_active == True,
+            self._text_filter(node)
+        )
+        if category:
+            query = query.filter(Document.category == category)
+        rows = query.order_by(score.desc(), DocumentPage.id).limit(settings.SEARCH_MAX_PAGE_HITS).all()
+        return [(page_id, document_id, page_number, float(page_score)) for page_id, document_id, page_number, page_score in rows]
+
+    def _text_filter(self, node: tuple):
+        kind = node[0]
+        if kind in ("term", "phrase"):
+            return DocumentPage.text.ilike(f"%{node[1]}%")
+        if kind == "not":
+            return ~self._text_filter(node[1])
+        children = [self._text_filter(child) for child in node[1]]
+        return and_(*children) if kind == "and" else or_(*children)
+
+    def _page_details(self, tree: tuple, match: Optional[str], hits: List[tuple], db: Session) -> Dict[int, tuple]:
+        """Snippet and highlight rectangles for each shown page, keyed by page id"""
+        if not hits:
+            return {}
+        page_ids = [hit[0] for hit in hits]
+
+        if match:
+            rows = db.execute(text(f"""
+                SELECT p.id, p.words,
+                       snippet(document_pages_search, 0, :start, :end, :ellipsis, :tokens),
+                       highlight(document_pages_search, 0, :start, :end)
+                FROM document_pages_search
+                JOIN document_pages p ON p.id = document_pages_search.rowid
+                WHERE document_pages_search MATCH :match
+                  AND document_pages_search.rowid IN ({",".join(str(int(page_id)) for page_id in page_ids)})
+            """), {
+                "match": match, "start": MARK_START, "end": MARK_END,
+                "ellipsis": "\u2026", "tokens": settings.SEARCH_SNIPPET_TOKENS
+            }).all()
+            details = {}
+            for page_id, packed_words, snippet, highlighted in rows:
+                matched = set()
+                for span in re.findall(f"{MARK_START}(.*?){MARK_END}", highlighted, re.S):
+                    matched.update(_normalize_word(word) for word in span.split())
+                details[page_id] = (_mark(snippet), self._word_positions(self.unpack_words(packed_words), matched))
+            return details
+
+        needles = [leaf[1] for negated, leaf in query_terms(tree) if not negated]
+        details = {}
+        for page_id, page_text, packed_words in db.query(
+            DocumentPage.id, DocumentPage.text, DocumentPage.words
+        ).filter(DocumentPage.id.in_(page_ids)):
+            words = self.unpack_words(packed_words)
+            positions = [position for needle in needles for position in self.locate(words, needle.split())]
+            details[page_id] = (_plain_snippet(page_text, needles), positions)
+        return details
+
+    @staticmethod
+    def _word_positions(words: list, matched: set) -> List[dict]:
+        return [
+            {"x0": x0, "y0": y0, "x1": x1, "y1": y1}
+            for x0, y0, x1, y1, word, _, _ in words
+            if _normalize_word(word) in matched
+        ]
+
+    @staticmethod
+    def locate(words: list, tokens: List[str]) -> List[dict]:
+        """Find the term in a page's words and return one rectangle per line it covers"""
+        positions = []
+
+        if len(tokens) == 1:
+            token = tokens[0]
+            for x0, y0, x1, y1, word, _, _ in words:
+                lowered = word.lower()
+                start = lowered.find(token)
+                while start != -1:
+                    positions.append(SearchIndex._slice_rect(x0, y0, x1, y1, len(word), start, start + len(token)))
+                    start = lowered.find(token, start + len(token))
+            return positions
+
+        count = len(tokens)
+        for i in range(len(words) - count + 1):
+            window = words[i:i + count]
+            first, last = window[0][4].lower(), window[-1][4].lower()
+            if not first.endswith(tokens[0]) or not last.startswith(tokens[-1]):
+                continue
+            if any(window[k][4].lower() != tokens[k] for k in range(1, count - 1)):
+                continue
+
+            lines = []
+            for k, (x0, y0, x1, y1, word, block, line) in enumerate(window):
+                start = len(word) - len(tokens[0]) if k == 0 else 0
+                end = len(tokens[-1]) if k == count - 1 else len(word)
+                rect = SearchIndex._slice_rect(x0, y0, x1, y1, len(word), start, end)
+                if lines and lines[-1][0] == (block, line):
+                    current = lines[-1][1]
+                    current["x0"] = min(current["x0"], rect["x0"])
+                    current["y0"] = min(current["y0"], rect["y0"])
+                    current["x1"] = max(current["x1"], rect["x1"])
+                    current["y1"] = max(current["y1"], rect["y1"])
+                else:
+                    lines.append(((block, line), rect))
+            positions.extend(rect for _, rect in lines)
+
+        return positions
+
+    @staticmethod
+    def _slice_rect(x0: float, y0: float, x1: float, y1: float, length: int, start: int, end: int) -> dict:
+        # Word boxes only; character offsets are interpolated across the width
+        width = (x1 - x0) / length if length else 0
+        return {"x0": x0 + width * start, "y0": y0, "x1": x0 + width * end, "y1": y1}
+
+    @staticmethod
+    def pack_words(words: list) -> bytes:
+        return zlib.compress(json.dumps(words, separators=(",", ":")).encode("utf-8"))
+
+    @staticmethod
+    def unpack_words(packed: Optional[bytes]) -> list:
+        if not packed:
+            return []
+        return json.loads(zlib.decompress(packed).decode("utf-8"))
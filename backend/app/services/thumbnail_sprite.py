@@ -0,0 +1,33 @@
+import json
+from typing import Optional
+
+from app.services.page_cache import get_page_cache
+from config import settings
+
+# Sprites are stored in the page cache under page 0, next to the document's rendered pages
+SPRITE_PAGE = 0
+
+def sprite_variant(thumb_height: int = None) -> str:
+    """Page cache variant key of a document's thumbnail sprite"""
+    return f"sprite{thumb_height or settings.SPRITE_THUMB_HEIGHT}"
+
+def load_sprite_map(content_hash: str) -> Optional[dict]:
+    """Offset map of a cached sprite, or None when the sprite has not been built"""
+    page_cache = get_page_cache()
+    variant = sprite_variant()
+    # The image is written before the map, so a map means both are there
+    map_path = page_cache.get(content_hash, SPRITE_PAGE, variant, "json")
+    if map_path is None or page_cache.get(content_hash, SPRITE_PAGE, variant, "jpeg") is None:
+        return None
+    try:
+        with open(map_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+def store_sprite(content_hash: str, image_data: bytes, sprite_map: dict):
+    page_cache = get_page_cache()
+    variant = sprite_variant()
+    page_cache.put(content_hash, SPRITE_PAGE, variant, "jpeg", image_data)
+    page_cache.put(content_hash, SPRITE_PAGE, variant, "json",
+                   json.dumps(sprite_map, separators=(",", ":")).encode("utf-8"))
@@ -0,0 +1,93 @@
+import asyncio
+import os
+import threading
+from typing import Iterator, Tuple
+
+from app.services.page_cache import get_page_cache
+from app.services.pdf_processor import PDFProcessor
+from app.services.render_executor import get_render_executor
+from config import settings
+
+def tile_variant(zoom: int, x: int, y: int, tile_size: int = None) -> str:
+    """Page cache variant key of a tile"""
+    return f"t{tile_size or settings.TILE_SIZE}z{zoom}x{x}y{y}"
+
+class TilePrefetcher:
+    """Renders the tiles around a requested one into the page cache.
+
+    Prefetches the neighbours within ``radius`` at the same zoom (panning) and
+    the four tiles one level deeper (zooming in). It only runs while the render
+    pool has an idle worker, so prefetching never delays a real request.
+    """
+
+    def __init__(self, radius: int = None):
+        self.radius = settings.TILE_PREFETCH_RADIUS if radius is None else radius
+        self._lock = threading.Lock()
+        self._pending = set()
+        self._tasks = set()
+
+    def schedule(self, file_path: str, content_hash: str, page: int, zoom: int, x: int, y: int):
+        if self.radius <= 0:
+            return
+        task = asyncio.create_task(self._prefetch(file_path, content_hash, page, zoom, x, y))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def neighbours(self, width: float, height: float, zoom: int, x: int, y: int) -> Iterator[Tuple[int, int, int]]:
+        grid = PDFProcessor.tile_grid(width, height, zoom, settings.TILE_SIZE)
+        for dy in range(-self.radius, self.radius + 1):
+            for dx in range(-self.radius, self.radius + 1):
+                if (dx or dy) and 0 <= x + dx < grid["columns"] and 0 <= y + dy < grid["rows"]:
+                    yield zoom, x + dx, y + dy
+
+        if zoom < settings.TILE_MAX_ZOOM:
+            deeper = PDFProcessor.tile_grid(width, height, zoom + 1, settings.TILE_SIZE)
+            for child_y in (2 * y, 2 * y + 1):
+                for child_x in (2 * x, 2 * x + 1):
+                    if child_x < deeper["columns"] and child_y < deeper["rows"]:
+                        yield zoom + 1, child_x, child_y
+
+    async def _prefetch(self, file_path: str, content_hash: str, page: int, zoom: int, x: int, y: int):
+        render_executor = get_render_executor()
+        page_cache = get_page_cache()
+        try:
+            if not render_executor.has_idle_worker():
+                return
+            width, height = await render_executor.get_page_size(file_path, page - 1)
+
+            for tile_zoom, tile_x, tile_y in self.neighbours(width, height, zoom, x, y):
+                variant = tile_variant(tile_zoom, tile_x, tile_y)
+                key = (content_hash, page, variant)
+                if os.path.exists(page_cache.entry_path(content_hash, page, variant, "png")):
+                    continue
+                if not render_executor.has_idle_worker():
+                    return
+                with self._lock:
+                    if key in self._pending:
+                        continue
+                    self._pending.add(key)
+                try:
+                    data = await render_executor.generate_page_tile(
+                        file_path, page - 1, tile_zoom, tile_x, tile_y, settings.TILE_SIZE
+                    )
+                    page_cache.put(content_hash, page, variant, "png", data)
+                finally:
+                    with self._lock:
+                        self._pending.discard(key)
+        except ValueError:
+            # The requested tile itself was out of range; its request reports that
+            return
+        except Exception as e:
+            print(f"Tile prefetch error: {str(e)}")
+
+_tile_prefetcher = None
+_tile_prefetcher_lock = threading.Lock()
+
+def get_tile_prefetcher() -> TilePrefetcher:
+    """Process-wide tile prefetcher, created on first use"""
+    global _tile_prefetcher
+    if _tile_prefetcher is None:
+        with _tile_prefetcher_lock:
+            if _tile_prefetcher is None:
+                _tile_prefetcher = TilePrefetcher()
+    return _tile_prefetcher
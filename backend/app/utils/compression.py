@@ -0,0 +1,162 @@
+import zlib
+from typing import Dict, Optional
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from config import settings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Images, PDFs and multipart preview streams are already compressed or must stream untouched
+COMPRESSIBLE_TYPES = (
+    "text/", "application/json", "application/javascript", "application/xml", "image/svg+xml"
+)
+
+def encoding_weights(accept_encoding: str) -> Dict[str, float]:
+    """q-value of each coding in an Accept-Encoding header"""
+    weights = {}
+    for item in accept_encoding.lower().split(","):
+        name, _, params = item.strip().partition(";")
+        weight = 1.0
+        for param in params.split(";"):
+            key, _, value = param.strip().partition("=")
+            if key == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+        if name.strip():
+            weights[name.strip()] = weight
+    return weights
+
+def accepts_encoding(weights: Dict[str, float], encoding: str) -> float:
+    return weights.get(encoding, weights.get("*", 0.0))
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """Pick br or gzip from an Accept-Encoding header, preferring br on equal q-values"""
+    weights = encoding_weights(accept_encoding)
+    supported = ["br", "gzip"] if brotli is not None else ["gzip"]
+    best = None
+    for encoding in supported:
+        weight = accepts_encoding(weights, encoding)
+        if weight > 0 and (best is None or weight > best[1]):
+            best = (encoding, weight)
+    return best[0] if best else None
+
+class _Compressor:
+    def __init__(self, encoding: str, gzip_level: int, brotli_quality: int):
+        if encoding == "br":
+            self._brotli = brotli.Compressor(quality=brotli_quality)
+        else:
+            self._brotli = None
+            self._zlib = zlib.compressobj(gzip_level, zlib.DEFLATED, 31)  # 31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        """Compress a chunk and flush it, so streamed bodies are not held back"""
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.flush()
+        return self._zlib.compress(data) + self._zlib.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        if self._brotli is not None:
+            return self._brotli.process(data) + self._brotli.finish()
+        return self._zlib.compress(data) + self._zlib.flush()
+
+class CompressionMiddleware:
+    """Compress text and JSON responses with brotli (when installed) or gzip.
+
+    Bodies under ``minimum_size`` are sent as they are, as are responses that
+    already carry a Content-Encoding (e.g. precompressed static files), byte
+    ranges and media types outside COMPRESSIBLE_TYPES.
+    """
+
+    def __init__(self, app: ASGIApp, minimum_size: int = None, gzip_level: int = None, brotli_quality: int = None):
+        self.app = app
+        self.minimum_size = settings.COMPRESSION_MIN_SIZE if minimum_size is None else minimum_size
+        self.gzip_level = gzip_level or settings.COMPRESSION_GZIP_LEVEL
+        self.brotli_quality = settings.COMPRESSION_BROTLI_QUALITY if brotli_quality is None else brotli_quality
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        responder = _CompressionResponder(send, encoding, self)
+        await self.app(scope, receive, responder.send)
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: str, middleware: CompressionMiddleware):
+        self._send = send
+        self.encoding = encoding
+        self.middleware = middleware
+        self.start_message: Optional[Message] = None
+        self.compressor: Optional[_Compressor] = None
+        self.passthrough = False
+
+    def _compressible(self, headers: Headers) -> bool:
+        if self.start_message["status"] != 200:
+            return False
+        if "content-encoding" in headers or "content-range" in headers:
+            return False
+        return headers.get("content-type", "").startswith(COMPRESSIBLE_TYPES)
+
+    async def send(self, message: Message) -> None:
+        if self.passthrough:
+            await self._send(message)
+            return
+
+        if message["type"] == "http.response.start":
+            self.start_message = message
+            headers = MutableHeaders(raw=message["headers"])
+            if not self._compressible(headers):
+                self.passthrough = True
+                await self._send(message)
+            elif "accept-encoding" not in headers.get("vary", "").lower():
+                headers.add_vary_header("Accept-Encoding")
+            return
+
+        if message["type"] != "http.response.body":
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.compressor is None:
+            if not more_body and len(body) < self.middleware.minimum_size:
+                self.passthrough = True
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            self.compressor = _Compressor(self.encoding, self.middleware.gzip_level, self.middleware.brotli_quality)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            etag = headers.get("etag")
+            if etag and not etag.startswith("W/"):
+                # The encoded bytes differ from the identity representation
+                headers["ETag"] = f"W/{etag}"
+
+            if not more_body:
+                body = self.compressor.finish(body)
+                headers["Content-Length"] = str(len(body))
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": body, "more_body": False})
+                return
+
+            del headers["Content-Length"]
+            await self._send(self.start_message)
+
+        if more_body:
+            await self._send({"type": "http.response.body", "body": self.compressor.compress(body), "more_body": True})
+        else:
+            await self._send({"type": "http.response.body", "body": self.compressor.finish(body), "more_body": False})
@@ -0,0 +1,25 @@
+import base64
+import json
+from datetime import datetime
+from typing import Any, Optional, Tuple
+
+def encode_cursor(sort: str, order: str, value: Any, last_id: int) -> str:
+    """Opaque keyset cursor for the row after (value, last_id) in the given ordering"""
+    if isinstance(value, datetime):
+        value = {"dt": value.isoformat()}
+    payload = json.dumps([sort, order, value, last_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor: str, sort: str, order: str) -> Optional[Tuple[Any, int]]:
+    """Return (value, last_id), or None if the cursor is malformed or from another ordering"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        cursor_sort, cursor_order, value, last_id = json.loads(base64.urlsafe_b64decode(padded))
+    except Exception:
+        return None
+
+    if cursor_sort != sort or cursor_order != order or not isinstance(last_id, int):
+        return None
+    if isinstance(value, dict) and "dt" in value:
+        value = datetime.fromisoformat(value["dt"])
+    return value, last_id
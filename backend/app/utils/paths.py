@@ -0,0 +1,9 @@
+import os
+
+def resolve_file_path(file_path: str) -> str:
+    """Resolve file path relative to the application root"""
+    if file_path.startswith('./'):
+        # Get the directory where the application is running from
+        app_root = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+        return os.path.join(app_root, file_path[2:])  # Remove './' prefix
+    return file_path
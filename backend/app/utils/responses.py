@@ -0,0 +1,149 @@
+import os
+from email.utils import parsedate
+from typing import Optional, Tuple
+
+import anyio
+from fastapi import Request
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse
+from starlette.types import Receive, Scope, Send
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+def parse_range(header: str, size: int) -> Optional[Tuple[int, int]]:
+    """Parse a single ``bytes=`` range into an inclusive (start, end).
+
+    Returns None for headers we ignore (other units, multiple or malformed
+    ranges), which means the whole file is sent.
+    """
+    unit, _, spec = header.partition("=")
+    if unit.strip().lower() != "bytes" or "," in spec:
+        return None
+
+    first, separator, last = spec.strip().partition("-")
+    if not separator:
+        return None
+
+    try:
+        if first == "":
+            suffix_length = int(last)
+            if suffix_length <= 0 or size == 0:
+                raise RangeNotSatisfiable()
+            return max(0, size - suffix_length), size - 1
+
+        start = int(first)
+        end = int(last) if last else max(start, size - 1)
+    except ValueError:
+        return None
+
+    if start < 0 or end < start:
+        return None
+    if start >= size:
+        raise RangeNotSatisfiable()
+    return start, min(end, size - 1)
+
+def etag_matches(if_none_match: str, etag: Optional[str]) -> bool:
+    """Weak comparison of an ETag against an If-None-Match header"""
+    if not etag:
+        return False
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+def is_not_modified(request_headers: Headers, etag: Optional[str], last_modified: Optional[str]) -> bool:
+    """Whether a conditional GET can be answered with 304.
+
+    If-None-Match decides when the request has one; If-Modified-Since is only
+    consulted otherwise.
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag_matches(if_none_match, etag)
+
+    if_modified_since = parsedate(request_headers.get("if-modified-since", ""))
+    last_modified = parsedate(last_modified or "")
+    return if_modified_since is not None and last_modified is not None and if_modified_since >= last_modified
+
+class RangeFileResponse(FileResponse):
+    """FileResponse with conditional requests and single byte ranges.
+
+    Answers ``If-None-Match`` with 304 and ``Range`` (honouring ``If-Range``)
+    with 206 or 416. The body is handed to the server as a zero-copy
+    ``sendfile`` when it supports the ASGI ``http.response.zerocopy``
+    extension, and streamed in chunks otherwise.
+    """
+
+    def __init__(self, path: str, request: Request, etag: str, media_type: str = None,
+                 filename: str = None, headers: dict = None):
+        stat_result = os.stat(path)
+        headers = dict(headers or {})
+        headers["etag"] = etag
+        headers["accept-ranges"] = "bytes"
+        super().__init__(path, headers=headers, media_type=media_type, filename=filename,
+                         stat_result=stat_result, method=request.method)
+
+        size = stat_result.st_size
+        self.start, self.end = 0, size - 1
+
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match is not None and etag_matches(if_none_match, etag):
+            self.status_code = 304
+            self.send_header_only = True
+            del self.headers["content-length"]
+            return
+
+        range_header = request.headers.get("range")
+        if range_header and self._if_range_matches(request.headers.get("if-range"), etag):
+            try:
+                byte_range = parse_range(range_header, size)
+            except RangeNotSatisfiable:
+                self.status_code = 416
+                self.send_header_only = True
+                self.headers["content-range"] = f"bytes */{size}"
+                self.headers["content-length"] = "0"
+                return
+
+            if byte_range is not None:
+                self.start, self.end = byte_range
+                self.status_code = 206
+                self.headers["content-range"] = f"bytes {self.start}-{self.end}/{size}"
+                self.headers["content-length"] = str(self.end - self.start + 1)
+
+    def _if_range_matches(self, header: Optional[str], etag: str) -> bool:
+        if not header:
+            return True
+        header = header.strip()
+        if header.startswith('"') or header.startswith("W/"):
+            # If-Range needs a strong comparison
+            return header == etag
+        return header == self.headers.get("last-modified")
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status_code,
+            "headers": self.raw_headers
+        })
+
+        remaining = self.end - self.start + 1
+        if self.send_header_only or remaining <= 0:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+
+        if "http.response.zerocopy" in scope.get("extensions", {}):
+            with open(self.path, "rb") as file:
+                await send({
+                    "type": "http.response.zerocopy",
+                    "file": file,
+                    "offset": self.start,
+                    "count": remaining,
+                    "more_body": False
+                })
+            return
+
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(self.start)
+            while remaining > 0:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                remaining = remaining - len(chunk) if chunk else 0
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
@@ -0,0 +1,146 @@
+import re
+from typing import List, Tuple
+
+# Parsed queries are nested tuples:
+#   ("term", text, prefix, fuzzy)  ("phrase", text)  ("not", node)
+#   ("and", [nodes])               ("or", [nodes])
+
+_TOKEN = re.compile(r'"[^"]*"?|[()]|[^\s()"]+')
+
+class QuerySyntaxError(ValueError):
+    pass
+
+def parse_query(query: str, max_terms: int = None) -> tuple:
+    """Parse a search query into a tree.
+
+    Terms are ANDed by default; ``OR`` and ``NOT`` (or a leading ``-``) combine
+    them, parentheses group, ``"..."`` is a phrase, ``term*`` a prefix and
+    ``term~`` asks for fuzzy matches. Operators must be upper case.
+    """
+    tokens = []
+    for token in _TOKEN.findall(query):
+        # A leading "-" negates what follows, unless it is all there is
+        while len(token) > 1 and token.startswith("-"):
+            tokens.append("NOT")
+            token = token[1:]
+        tokens.append(token)
+
+    parser = _Parser(tokens)
+    tree = parser.parse()
+    if tree is None:
+        raise QuerySyntaxError("Search query has no terms")
+    if max_terms and parser.term_count > max_terms:
+        raise QuerySyntaxError(f"Search query has more than {max_terms} terms")
+    return tree
+
+class _Parser:
+    def __init__(self, tokens: List[str]):
+        self.tokens = tokens
+        self.position = 0
+        self.term_count = 0
+
+    def parse(self):
+        node = self._or()
+        if self.position < len(self.tokens):
+            raise QuerySyntaxError(f"Unexpected '{self.tokens[self.position]}' in search query")
+        return node
+
+    def _peek(self):
+        return self.tokens[self.position] if self.position < len(self.tokens) else None
+
+    def _expect_term(self, operator: str):
+        if self._peek() in (None, "AND", "OR", ")"):
+            raise QuerySyntaxError(f"Expected a term after '{operator}' in search query")
+
+    def _or(self):
+        if self._peek() in ("AND", "OR"):
+            raise QuerySyntaxError(f"Expected a term before '{self._peek()}' in search query")
+        nodes = [self._and()]
+        while self._peek() == "OR":
+            self.position += 1
+            self._expect_term("OR")
+            nodes.append(self._and())
+        nodes = [node for node in nodes if node is not None]
+        if not nodes:
+            return None
+        return nodes[0] if len(nodes) == 1 else ("or", nodes)
+
+    def _and(self):
+        nodes = []
+        while self._peek() not in (None, "OR", ")"):
+            if self._peek() == "AND":
+                self.position += 1
+                self._expect_term("AND")
+                continue
+            node = self._unary()
+            if node is not None:
+                nodes.append(node)
+        if not nodes:
+            return None
+        return nodes[0] if len(nodes) == 1 else ("and", nodes)
+
+    def _unary(self):
+        if self._peek() == "NOT":
+            self.position += 1
+            self._expect_term("NOT")
+            node = self._unary()
+            return None if node is None else ("not", node)
+        return self._atom()
+
+    def _atom(self):
+        token = self.tokens[self.position]
+        self.position += 1
+
+        if token == "(":
+            node = self._or()
+            if self._peek() != ")":
+                raise QuerySyntaxError("Unbalanced parentheses in search query")
+            self.position += 1
+            return node
+        if token == ")":
+            raise QuerySyntaxError("Unbalanced parentheses in search query")
+
+        if token.startswith('"'):
+            phrase = " ".join(token.strip('"').split())
+            if not _has_word(phrase):
+                return None
+            self.term_count += len(phrase.split())
+            return ("phrase", phrase.lower())
+
+        prefix = token.endswith("*")
+        fuzzy = token.endswith("~")
+        term = token.rstrip("*~").lower()
+        if not _has_word(term):
+            return None
+        self.term_count += 1
+        return ("term", term, prefix, fuzzy)
+
+def _has_word(value: str) -> bool:
+    return any(character.isalnum() for character in value)
+
+def query_terms(node: tuple, negated: bool = False) -> List[Tuple[bool, tuple]]:
+    """Leaf nodes of a query with whether each is excluded, in query order"""
+    kind = node[0]
+    if kind in ("term", "phrase"):
+        return [(negated, node)]
+    if kind == "not":
+        return query_terms(node[1], not negated)
+    return [leaf for child in node[1] for leaf in query_terms(child, negated)]
+
+def edit_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance (transpositions count as one edit), capped at ``limit + 1``"""
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                current[j] = min(current[j], previous2[j - 2] + 1)
+        if min(current) > limit:
+            return limit + 1
+        previous2, previous = previous, current
+    return min(previous[-1], limit + 1)
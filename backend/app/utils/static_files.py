@@ -0,0 +1,103 @@
+import hashlib
+import mimetypes
+import os
+import re
+import threading
+from typing import Dict, Tuple
+
+from starlette.datastructures import Headers, QueryParams
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+from app.utils.compression import accepts_encoding, encoding_weights
+from app.utils.responses import is_not_modified
+from config import settings
+
+# Precompressed siblings (main.css.br, main.css.gz) in order of preference
+PRECOMPRESSED_VARIANTS = (("br", ".br"), ("gzip", ".gz"))
+
+_ASSET_REFERENCE = re.compile(r'(href|src)="/static/([^"?#]+)(?:\?[^"#]*)?"')
+
+class StaticAssets(StaticFiles):
+    """StaticFiles with content-hashed URLs, far-future caching and precompressed variants.
+
+    ``asset_url`` adds ``?v=<content hash>`` to a path; requests that carry the
+    current hash are cacheable for ``max_age`` as immutable, anything else is
+    revalidated with ETag/Last-Modified on every use. When the client accepts
+    it, ``<file>.br`` or ``<file>.gz`` is sent instead of the file, provided it
+    is at least as new.
+    """
+
+    def __init__(self, directory: str, prefix: str = "/static", max_age: int = None):
+        super().__init__(directory=directory)
+        self.prefix = prefix
+        self.max_age = settings.STATIC_MAX_AGE if max_age is None else max_age
+        self._lock = threading.Lock()
+        self._hashes: Dict[str, Tuple[int, int, str]] = {}  # full path -> (mtime_ns, size, hash)
+
+    def _content_hash(self, full_path: str, stat_result: os.stat_result) -> str:
+        with self._lock:
+            cached = self._hashes.get(full_path)
+        if cached and cached[:2] == (stat_result.st_mtime_ns, stat_result.st_size):
+            return cached[2]
+
+        with open(full_path, "rb") as f:
+            content_hash = hashlib.sha256(f.read()).hexdigest()[:16]
+        with self._lock:
+            self._hashes[full_path] = (stat_result.st_mtime_ns, stat_result.st_size, content_hash)
+        return content_hash
+
+    def asset_url(self, path: str) -> str:
+        """Versioned URL of a file under the static directory, or the plain URL if it is missing"""
+        full_path, stat_result = self.lookup_path(path)
+        if stat_result is None:
+            return f"{self.prefix}/{path}"
+        return f"{self.prefix}/{path}?v={self._content_hash(full_path, stat_result)}"
+
+    def render_page(self, file_path: str) -> str:
+        """HTML of a page with its /static references pointed at the current asset versions"""
+        with open(file_path, "r", encoding="utf-8") as f:
+            html = f.read()
+        return _ASSET_REFERENCE.sub(lambda match: f'{match.group(1)}="{self.asset_url(match.group(2))}"', html)
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope, status_code: int = 200) -> Response:
+        request_headers = Headers(scope=scope)
+        media_type = mimetypes.guess_type(str(full_path))[0] or "text/plain"
+        headers = {"Vary": "Accept-Encoding"}
+
+        version = QueryParams(scope.get("query_string", b"")).get("v")
+        if version and version == self._content_hash(str(full_path), stat_result):
+            headers["Cache-Control"] = f"public, max-age={self.max_age}, immutable"
+        else:
+            headers["Cache-Control"] = "no-cache"
+
+        weights = encoding_weights(request_headers.get("accept-encoding", ""))
+        for encoding, suffix in PRECOMPRESSED_VARIANTS:
+            if accepts_encoding(weights, encoding) <= 0:
+                continue
+            try:
+                variant_stat = os.stat(f"{full_path}{suffix}")
+            except OSError:
+                continue
+            if variant_stat.st_mtime_ns < stat_result.st_mtime_ns:
+                continue  # Left over from an older version of the file
+            headers["Content-Encoding"] = encoding
+            response = FileResponse(f"{full_path}{suffix}", status_code=status_code, stat_result=variant_stat,
+                                    method=scope["method"], media_type=media_type, headers=headers)
+            break
+        else:
+            response = FileResponse(full_path, status_code=status_code, stat_result=stat_result,
+                                    method=scope["method"], media_type=media_type, headers=headers)
+
+        etag = response.headers.get("etag")
+        if etag and not etag.startswith('"'):
+            # Starlette leaves file ETags unquoted
+            response.headers["etag"] = f'"{etag}"'
+
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+    def is_not_modified(self, response_headers: Headers, request_headers: Headers) -> bool:
+        return is_not_modified(request_headers, response_headers.get("etag"), response_headers.get("last-modified"))
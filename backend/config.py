@@ -6,11 +6,81 @@ load_dotenv()
 
 class Settings:
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./documents.db")
+    ASYNC_DATABASE_URL: str = os.getenv("ASYNC_DATABASE_URL", "")  # derived from DATABASE_URL when empty
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+    DB_POOL_RECYCLE: int = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+    DB_POOL_PRE_PING: bool = os.getenv("DB_POOL_PRE_PING", "true").lower() in ("1", "true", "yes")
+    DB_CONNECT_TIMEOUT: int = int(os.getenv("DB_CONNECT_TIMEOUT", "10"))
+    SQLITE_JOURNAL_MODE: str = os.getenv("SQLITE_JOURNAL_MODE", "WAL")
+    SQLITE_SYNCHRONOUS: str = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", "268435456"))  # 256MB
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "65536"))  # 64MB
     SECRET_KEY: str = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
     UPLOAD_MAX_SIZE: int = int(os.getenv("UPLOAD_MAX_SIZE", "52428800"))  # 50MB
+    UPLOAD_CONCURRENCY: int = int(os.getenv("UPLOAD_CONCURRENCY", "4"))
+    UPLOAD_SESSION_MAX_SIZE: int = int(os.getenv("UPLOAD_SESSION_MAX_SIZE", "2147483648"))  # 2GB
+    UPLOAD_SESSION_CHUNK_SIZE: int = int(os.getenv("UPLOAD_SESSION_CHUNK_SIZE", "8388608"))  # 8MB
+    UPLOAD_SESSION_TTL_HOURS: float = float(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+    LINEARIZE_UPLOADS: bool = os.getenv("LINEARIZE_UPLOADS", "true").lower() in ("1", "true", "yes")
+    LINEARIZE_MIN_SIZE: int = int(os.getenv("LINEARIZE_MIN_SIZE", "1048576"))  # 1MB
     ALLOWED_EXTENSIONS: List[str] = ["pdf"]
     CORS_ORIGINS: List[str] = os.getenv("CORS_ORIGINS", "http://localhost:8000").split(",")
     UPLOAD_DIRECTORY: str = "./uploads"
     CATEGORIES: List[str] = ["opord", "warno", "intel"]
+    DOCUMENT_LIST_MAX_LIMIT: int = int(os.getenv("DOCUMENT_LIST_MAX_LIMIT", "1000"))
+    PAGE_CACHE_DIRECTORY: str = os.getenv("PAGE_CACHE_DIRECTORY", "./cache/pages")
+    PAGE_CACHE_MAX_BYTES: int = int(os.getenv("PAGE_CACHE_MAX_BYTES", "536870912"))  # 512MB
+    DOCUMENT_CACHE_SIZE: int = int(os.getenv("DOCUMENT_CACHE_SIZE", "2048"))  # 0 disables the cache
+    DOCUMENT_CACHE_TTL: float = float(os.getenv("DOCUMENT_CACHE_TTL", "30"))  # seconds
+    RENDER_POOL_MODE: str = os.getenv("RENDER_POOL_MODE", "process")  # process, or thread (renders one at a time)
+    RENDER_POOL_WORKERS: int = int(os.getenv("RENDER_POOL_WORKERS", str(min(4, os.cpu_count() or 1))))
+    RENDER_QUEUE_LIMIT: int = int(os.getenv("RENDER_QUEUE_LIMIT", "32"))
+    RENDER_JOB_TIMEOUT: float = float(os.getenv("RENDER_JOB_TIMEOUT", "30"))
+    RENDER_RETRY_AFTER: int = int(os.getenv("RENDER_RETRY_AFTER", "2"))
+    PDF_HANDLE_POOL_SIZE: int = int(os.getenv("PDF_HANDLE_POOL_SIZE", "32"))
+    PDF_HANDLE_IDLE_SECONDS: float = float(os.getenv("PDF_HANDLE_IDLE_SECONDS", "300"))
+    PROCESSING_WORKERS: int = int(os.getenv("PROCESSING_WORKERS", "1"))
+    PROCESSING_POLL_INTERVAL: float = float(os.getenv("PROCESSING_POLL_INTERVAL", "5"))
+    PROCESSING_MAX_ATTEMPTS: int = int(os.getenv("PROCESSING_MAX_ATTEMPTS", "3"))
+    PROCESSING_RETRY_DELAY: float = float(os.getenv("PROCESSING_RETRY_DELAY", "30"))  # seconds, doubled per attempt
+    THUMBNAIL_DPI: int = int(os.getenv("THUMBNAIL_DPI", "36"))
+    PRERENDER_PAGES: int = int(os.getenv("PRERENDER_PAGES", "3"))
+    PRERENDER_DPIS: List[int] = [int(dpi) for dpi in os.getenv("PRERENDER_DPIS", "150").split(",")]
+    PREVIEW_MIN_DPI: int = int(os.getenv("PREVIEW_MIN_DPI", "36"))
+    PREVIEW_MAX_DPI: int = int(os.getenv("PREVIEW_MAX_DPI", "300"))
+    PREVIEW_MAX_WIDTH: int = int(os.getenv("PREVIEW_MAX_WIDTH", "4096"))
+    PREVIEW_BATCH_MAX_PAGES: int = int(os.getenv("PREVIEW_BATCH_MAX_PAGES", "50"))
+    PREVIEW_BATCH_CHUNK_PAGES: int = int(os.getenv("PREVIEW_BATCH_CHUNK_PAGES", "8"))
+    TILE_SIZE: int = int(os.getenv("TILE_SIZE", "256"))
+    TILE_MAX_ZOOM: int = int(os.getenv("TILE_MAX_ZOOM", "6"))
+    TILE_PREFETCH_RADIUS: int = int(os.getenv("TILE_PREFETCH_RADIUS", "1"))  # 0 disables prefetching
+    SPRITE_THUMB_HEIGHT: int = int(os.getenv("SPRITE_THUMB_HEIGHT", "96"))
+    SPRITE_COLUMNS: int = int(os.getenv("SPRITE_COLUMNS", "10"))
+    SPRITE_MAX_PAGES: int = int(os.getenv("SPRITE_MAX_PAGES", "300"))
+    SPRITE_QUALITY: int = int(os.getenv("SPRITE_QUALITY", "70"))
+    SEARCH_DEFAULT_LIMIT: int = int(os.getenv("SEARCH_DEFAULT_LIMIT", "20"))
+    SEARCH_MAX_LIMIT: int = int(os.getenv("SEARCH_MAX_LIMIT", "100"))
+    SEARCH_MAX_PAGE_HITS: int = int(os.getenv("SEARCH_MAX_PAGE_HITS", "1000"))  # best pages ranked per query
+    SEARCH_PAGES_PER_DOCUMENT: int = int(os.getenv("SEARCH_PAGES_PER_DOCUMENT", "5"))
+    SEARCH_MAX_TERMS: int = int(os.getenv("SEARCH_MAX_TERMS", "16"))
+    SEARCH_FUZZY_MAX_EXPANSIONS: int = int(os.getenv("SEARCH_FUZZY_MAX_EXPANSIONS", "5"))
+    SEARCH_FUZZY_SCAN_LIMIT: int = int(os.getenv("SEARCH_FUZZY_SCAN_LIMIT", "20000"))
+    SEARCH_SNIPPET_TOKENS: int = int(os.getenv("SEARCH_SNIPPET_TOKENS", "16"))
+    SCAN_WORKERS: int = int(os.getenv("SCAN_WORKERS", str(min(4, os.cpu_count() or 1))))
+    SCAN_POOL_MIN_FILES: int = int(os.getenv("SCAN_POOL_MIN_FILES", "8"))
+    SCAN_BATCH_SIZE: int = int(os.getenv("SCAN_BATCH_SIZE", "200"))
+    SCAN_INTERVAL_SECONDS: float = float(os.getenv("SCAN_INTERVAL_SECONDS", "0"))  # 0 = startup scan only
+    WATCH_UPLOADS: bool = os.getenv("WATCH_UPLOADS", "false").lower() in ("1", "true", "yes")
+    WATCH_MODE: str = os.getenv("WATCH_MODE", "auto")  # auto, inotify or poll
+    WATCH_DEBOUNCE_SECONDS: float = float(os.getenv("WATCH_DEBOUNCE_SECONDS", "2"))
+    WATCH_POLL_INTERVAL: float = float(os.getenv("WATCH_POLL_INTERVAL", "5"))
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() in ("1", "true", "yes")
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))  # bytes
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))  # needs the brotli package
+    STATIC_MAX_AGE: int = int(os.getenv("STATIC_MAX_AGE", "31536000"))  # for content-hashed asset URLs
 
 settings = Settings()
\ No newline at end of file
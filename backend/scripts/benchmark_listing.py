@@ -0,0 +1,173 @@
+"""Benchmark document listing serialization on a synthetic catalogue.
+
+Run from the backend directory:
+
+    python scripts/benchmark_listing.py --documents 10000 --rounds 10
+
+A throwaway SQLite database is filled with documents, then the script times
+
+* the encoding stage alone, on the same rows: per-field ``serialize_value``
+  dicts validated against ``List[dict]``, run through ``jsonable_encoder`` and
+  encoded with ``json`` (the previous path), against ``Document.serialize_rows``
+  encoded with orjson (the current one);
+* whole ``GET /api/documents/`` requests through the ASGI app, next to a copy
+  of the listing that returns plain dicts the previous way.
+
+Both paths must produce the same JSON, which is checked before timing.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import List
+
+DATABASE_DIRECTORY = tempfile.mkdtemp(prefix="docview-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(DATABASE_DIRECTORY, 'benchmark.db')}"
+os.environ["ASYNC_DATABASE_URL"] = ""
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import Depends
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+import httpx
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.database.connection import SessionLocal, async_engine, create_tables, get_async_db
+from app.main import app
+from app.models.document import CategoryEnum, Document
+
+CATEGORIES = list(CategoryEnum)
+TAGS = ["training", "exercise", "logistics", "cyber", "priority", "archive"]
+
+def populate(count: int):
+    started = datetime(2025, 1, 1)
+    rows = [
+        {
+            "filename": f"{i:08d}_document-{i}.pdf",
+            "original_name": f"Document {i}.pdf",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "file_path": f"./uploads/{CATEGORIES[i % len(CATEGORIES)].value}/document-{i}.pdf",
+            "file_size": 50000 + i * 37 % 900000,
+            "content_hash": f"{i:064x}",
+            "page_count": 1 + i % 40,
+            "upload_date": started + timedelta(minutes=i, microseconds=i % 7),
+            "description": f"Synthetic document {i} for listing benchmarks",
+            "tags": ",".join(TAGS[j] for j in range(i % 4)),
+            "classification_level": "UNCLASSIFIED",
+            "created_by": "Benchmark",
+            "is_active": True
+        }
+        for i in range(count)
+    ]
+    db = SessionLocal()
+    try:
+        db.execute(insert(Document), rows)
+        db.commit()
+    finally:
+        db.close()
+
+def listing_query():
+    fields = Document.SERIALIZABLE_FIELDS
+    return fields, select(*[getattr(Document, field) for field in fields]).filter(
+        Document.is_active == True
+    ).order_by(Document.upload_date.desc(), Document.id.desc())
+
+@app.get("/benchmark/legacy-listing", response_model=List[dict])
+async def legacy_listing(db: AsyncSession = Depends(get_async_db)):
+    """The listing as it was served before: dicts per row, left to FastAPI to encode"""
+    fields, query = listing_query()
+    rows = (await db.execute(query)).all()
+    return [
+        {field: Document.serialize_value(field, row[i]) for i, field in enumerate(fields)}
+        for row in rows
+    ]
+
+def legacy_encode(fields, rows, response_field) -> bytes:
+    documents = [
+        {field: Document.serialize_value(field, row[i]) for i, field in enumerate(fields)}
+        for row in rows
+    ]
+    # Validates against List[dict] and runs jsonable_encoder, as the route handler does
+    content = asyncio.run(serialize_response(field=response_field, response_content=documents))
+    return JSONResponse(content).body
+
+def orjson_encode(fields, rows) -> bytes:
+    return ORJSONResponse(Document.serialize_rows(fields, rows)).body
+
+def best_of(rounds: int, function) -> float:
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+async def time_requests(rounds: int) -> tuple:
+    """Best (previous, current) listing request times, on one event loop so pooled connections stay usable"""
+    # The ASGI transport skips lifespan events, so no startup scan or workers run
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://benchmark") as client:
+        async def get_legacy():
+            return await client.get("/benchmark/legacy-listing")
+
+        async def get_current():
+            return await client.get("/api/documents/", params={"include_total": "false"})
+
+        if (await get_legacy()).json() != (await get_current()).json():
+            sys.exit("Listing responses differ")
+
+        timings = {get_legacy: [], get_current: []}
+        for _ in range(rounds):
+            for request, times in timings.items():
+                started = time.perf_counter()
+                response = await request()
+                response.raise_for_status()
+                times.append(time.perf_counter() - started)
+    # Pooled aiosqlite connections keep a thread each, which would hold up exit
+    await async_engine.dispose()
+    return min(timings[get_legacy]), min(timings[get_current])
+
+def report(label: str, legacy: float, current: float, documents: int):
+    print(f"{label}")
+    print(f"  previous: {legacy * 1000:9.1f} ms  {documents / legacy:12,.0f} documents/s")
+    print(f"  orjson:   {current * 1000:9.1f} ms  {documents / current:12,.0f} documents/s")
+    print(f"  speedup:  {legacy / current:9.2f}x")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--documents", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+
+    create_tables()
+    populate(args.documents)
+
+    fields, query = listing_query()
+    db = SessionLocal()
+    try:
+        rows = db.execute(query).all()
+    finally:
+        db.close()
+
+    response_field = create_response_field(name="Response_legacy_listing", type_=List[dict])
+    if json.loads(legacy_encode(fields, rows, response_field)) != json.loads(orjson_encode(fields, rows)):
+        sys.exit("Serialized listings differ")
+
+    print(f"{len(rows):,} documents, best of {args.rounds} rounds\n")
+    report(
+        "Encoding only",
+        best_of(args.rounds, lambda: legacy_encode(fields, rows, response_field)),
+        best_of(args.rounds, lambda: orjson_encode(fields, rows)),
+        len(rows)
+    )
+
+    print()
+    report("GET /api/documents/", *asyncio.run(time_requests(args.rounds)), len(rows))
+
+if __name__ == "__main__":
+    main()
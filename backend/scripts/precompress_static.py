@@ -0,0 +1,84 @@
+"""Write .gz (and, with the brotli package, .br) copies of the frontend assets.
+
+Run from the backend directory after deploying or changing the frontend:
+
+    python scripts/precompress_static.py [--directory ../frontend]
+
+The static file handler sends these instead of the originals to clients that
+accept the encoding, so assets are compressed once at maximum level instead
+of on every request. Copies older than their source are ignored when serving
+and rewritten here; ``--clean`` removes them all.
+"""
+import argparse
+import gzip
+import os
+import sys
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+BACKEND_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIRECTORY)
+
+from config import settings
+
+EXTENSIONS = (".js", ".css", ".html", ".svg", ".json", ".txt")
+
+def write_variant(path: str, data: bytes):
+    # Written after the source was read, so it is never older than the source
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, path)
+
+def precompress(directory: str, minimum_size: int) -> int:
+    written = 0
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if not filename.endswith(EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, filename)
+            if os.path.getsize(path) < minimum_size:
+                continue
+
+            with open(path, "rb") as f:
+                data = f.read()
+            variants = [(".gz", gzip.compress(data, compresslevel=9, mtime=0))]
+            if brotli is not None:
+                variants.append((".br", brotli.compress(data, quality=11)))
+
+            for suffix, compressed in variants:
+                if len(compressed) >= len(data):
+                    continue
+                write_variant(path + suffix, compressed)
+                written += 1
+                print(f"{os.path.relpath(path + suffix, directory)}: {len(data)} -> {len(compressed)} bytes")
+    return written
+
+def clean(directory: str) -> int:
+    removed = 0
+    for dirpath, _, filenames in os.walk(directory):
+        for filename in filenames:
+            if filename.endswith((".gz", ".br")) and filename[:-3].endswith(EXTENSIONS):
+                os.remove(os.path.join(dirpath, filename))
+                removed += 1
+    return removed
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--directory", default=os.path.join(os.path.dirname(BACKEND_DIRECTORY), "frontend"))
+    parser.add_argument("--clean", action="store_true", help="remove precompressed copies instead")
+    args = parser.parse_args()
+
+    if args.clean:
+        print(f"Removed {clean(args.directory)} precompressed files")
+        return
+
+    if brotli is None:
+        print("brotli is not installed; writing gzip copies only")
+    print(f"Wrote {precompress(args.directory, settings.COMPRESSION_MIN_SIZE)} precompressed files")
+
+if __name__ == "__main__":
+    main()
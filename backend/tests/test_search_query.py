@@ -0,0 +1,16 @@
+import pytest
+
+from app.utils.search_query import QuerySyntaxError, parse_query
+
+
+@pytest.mark.parametrize("query", ["NOT", "a NOT", "a AND", "a OR", "AND", "OR", "OR a", "AND a", "a AND NOT", "a OR OR b", "(a OR)", "-NOT"])
+def test_dangling_operator_is_a_syntax_error(query):
+    with pytest.raises(QuerySyntaxError):
+        parse_query(query)
+
+
+def test_operators_combine_terms():
+    assert parse_query("a AND b OR NOT c") == (
+        "or", [("and", [("term", "a", False, False), ("term", "b", False, False)]),
+               ("not", ("term", "c", False, False))]
+    )
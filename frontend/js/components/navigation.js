@@ -5,6 +5,8 @@ class NavigationManager {
             warno: [],
             intel: []
         };
+        this.nextCursors = {};
+        this.pageSize = 100;
         this.activeDocument = null;
         this.collapsedSections = new Set();
         this.setupEventListeners();
@@ -21,10 +23,11 @@ class NavigationManager {
             const categories = ['opord', 'warno', 'intel'];
             
             for (const category of categories) {
-                const documents = await apiService.getDocumentsByCategory(category);
-                this.documents[category] = documents;
-                this.renderCategoryDocuments(category, documents);
-                this.updateFileCount(category, documents.length);
+                const page = await apiService.getDocumentsPage(category, { limit: this.pageSize });
+                this.documents[category] = page.documents;
+                this.nextCursors[category] = page.nextCursor;
+                this.renderCategoryDocuments(category, page.documents);
+                this.updateFileCount(category, page.total ?? page.documents.length);
             }
             
         } catch (error) {
@@ -55,7 +58,8 @@ class NavigationManager {
             return;
         }
 
-        fileList.innerHTML = documents.map(doc => this.createDocumentItem(doc)).join('');
+        fileList.innerHTML = documents.map(doc => this.createDocumentItem(doc)).join('') +
+            (this.nextCursors[category] ? this.createLoadMoreItem(category) : '');
         
         // Generate thumbnails for documents
         setTimeout(() => {
@@ -63,9 +67,81 @@ class NavigationManager {
         }, 100);
     }
 
-    async generateThumbnails(documents) {
-        // Temporarily disabled thumbnail generation to focus on PDF loading
-        console.log('Thumbnail generation disabled for now');
+    createLoadMoreItem(category) {
+        return `
+            <div class="file-item load-more" onclick="navigationManager.loadMoreDocuments('${category}')">
+                <div class="file-info">
+                    <div class="file-name">Load more…</div>
+                </div>
+            </div>
+        `;
+    }
+
+    async loadMoreDocuments(category) {
+        const cursor = this.nextCursors[category];
+        if (!cursor) return;
+        
+        try {
+            this.nextCursors[category] = null;
+            const page = await apiService.getDocumentsPage(category, { limit: this.pageSize, cursor, includeTotal: false });
+            this.documents[category] = this.documents[category].concat(page.documents);
+            this.nextCursors[category] = page.nextCursor;
+            this.renderCategoryDocuments(category, this.documents[category]);
+        } catch (error) {
+            this.nextCursors[category] = cursor;
+            console.error('Error loading more documents:', error);
+            this.showError('Failed to load documents');
+        }
+    }
+
+    generateThumbnails(documents) {
+        // Each document's pages come packed in one sprite; only fetch maps for rows that scroll into view
+        if (!this.thumbnailObserver && 'IntersectionObserver' in window) {
+            this.thumbnailObserver = new IntersectionObserver(entries => {
+                entries.filter(entry => entry.isIntersecting).forEach(entry => {
+                    this.thumbnailObserver.unobserve(entry.target);
+                    this.loadThumbnail(entry.target.querySelector('.file-thumbnail'));
+                });
+            });
+        }
+
+        documents.forEach(doc => {
+            const thumbnail = document.querySelector(`.file-thumbnail[data-document-id="${doc.id}"]`);
+            if (!thumbnail || !doc.page_count || thumbnail.dataset.thumbnailLoaded) return;
+            
+            if (this.thumbnailObserver) {
+                // The thumbnail box stays hidden until it has an image, so watch its row
+                this.thumbnailObserver.observe(thumbnail.closest('.file-item'));
+            } else {
+                this.loadThumbnail(thumbnail);
+            }
+        });
+    }
+
+    async loadThumbnail(thumbnail) {
+        const documentId = thumbnail.dataset.documentId;
+        thumbnail.dataset.thumbnailLoaded = 'true';
+        
+        try {
+            if (!this.thumbnailMaps) this.thumbnailMaps = {};
+            const spriteMap = this.thumbnailMaps[documentId] || await apiService.getThumbnailMap(documentId);
+            this.thumbnailMaps[documentId] = spriteMap;
+            
+            const firstPage = spriteMap.pages[0];
+            if (!firstPage) return;
+            
+            thumbnail.closest('.file-item').classList.add('has-thumbnail');
+            
+            // Scale the sprite so page 1 fills the thumbnail box
+            const scale = thumbnail.clientHeight / firstPage.height;
+            thumbnail.style.backgroundImage = `url("${spriteMap.sprite_url}")`;
+            thumbnail.style.backgroundSize = `${spriteMap.width * scale}px ${spriteMap.height * scale}px`;
+            thumbnail.style.backgroundPosition = `${-firstPage.x * scale}px ${-firstPage.y * scale}px`;
+            thumbnail.style.backgroundRepeat = 'no-repeat';
+        } catch (error) {
+            delete thumbnail.dataset.thumbnailLoaded;
+            console.warn(`Thumbnail unavailable for document ${documentId}:`, error);
+        }
     }
 
     createDocumentItem(document) {
@@ -289,6 +365,7 @@ class NavigationManager {
                         <span class="content-result-name">${doc.original_name}</span>
                         <span class="content-result-matches">${matches} matches</span>
                     </div>
+                    ${result.snippet ? `<div class="content-result-snippet">${result.snippet}</div>` : ''}
                     <div class="content-result-meta">
                         <span class="content-result-category">${doc.category.toUpperCase()}</span>
                         <span class="content-result-pages">Pages: ${pages}</span>
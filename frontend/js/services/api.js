@@ -54,6 +54,31 @@ class APIService {
         return this.request(`/documents/${category}`);
     }
 
+    async getDocumentsPage(category = null, { limit = 100, cursor = null, fields = null, sort = null, order = null, includeTotal = true } = {}) {
+        const params = new URLSearchParams({ limit });
+        
+        if (cursor) params.append('cursor', cursor);
+        if (fields) params.append('fields', Array.isArray(fields) ? fields.join(',') : fields);
+        if (sort) params.append('sort', sort);
+        if (order) params.append('order', order);
+        if (!includeTotal) params.append('include_total', 'false');
+        
+        const path = category ? `/documents/${category}` : '/documents/';
+        const response = await fetch(`${this.baseURL}${path}?${params.toString()}`);
+        
+        if (!response.ok) {
+            const errorText = await response.text();
+            throw new Error(`HTTP ${response.status}: ${errorText}`);
+        }
+        
+        const total = response.headers.get('X-Total-Count');
+        return {
+            documents: await response.json(),
+            nextCursor: response.headers.get('X-Next-Cursor'),
+            total: total !== null ? parseInt(total, 10) : null
+        };
+    }
+
     async getDocument(documentId) {
         return this.request(`/documents/doc/${documentId}`);
     }
@@ -66,6 +91,10 @@ class APIService {
         return this.request(`/documents/doc/${documentId}/preview/${page}`);
     }
 
+    async getThumbnailMap(documentId) {
+        return this.request(`/documents/doc/${documentId}/thumbnails`);
+    }
+
     async deleteDocument(documentId) {
         return this.request(`/documents/doc/${documentId}`, {
             method: 'DELETE'
@@ -23,7 +23,13 @@ class PDFService {
             const pdfUrl = `/api/documents/doc/${documentId}/content`;
             console.log('Loading PDF from URL:', pdfUrl);
             
-            this.currentPDF = await pdfjsLib.getDocument(pdfUrl).promise;
+            // Fetch by byte range so the first page renders before the whole file arrives
+            this.currentPDF = await pdfjsLib.getDocument({
+                url: pdfUrl,
+                rangeChunkSize: 262144,
+                disableStream: true,
+                disableAutoFetch: true
+            }).promise;
             console.log('PDF loaded successfully, pages:', this.currentPDF.numPages);
             
             this.totalPages = this.currentPDF.numPages;